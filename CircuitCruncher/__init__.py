@@ -1,5 +1,52 @@
-from file_readers import *
-from data_processing import *
-from plot_manager import *
-from data_formating import *
-from spice_sim import *
+import importlib
+
+# Public names are imported from their module on first access, so e.g. reading a raw file does not
+# pay for importing matplotlib, pandas and prettytable
+_MODULES = ('file_readers', 'data_processing', 'plot_manager', 'data_formating', 'spice_sim', 'lookup_table',
+            'interpolation', 'crossings', 'transient', 'spectral')
+_EXPORTS = {
+    'file_readers': (
+        'BSIZE_SP', 'MDATA_LIST', 'SIM_ALIASES', 'ng_raw_read', 'ng_raw_iter', 'ng_raw_stack', 'ng_raw_index',
+        'ng_raw_read_plot', 'raw_cache_dir', 'ng_raw_read_cached', 'clear_raw_cache', 'ng_raw_read_many',
+        'RawFollower', 'ng_raw_write', 'ng_raw_extract', 'to_data_frames', 'to_data_frame',
+        'get_column_as_array', 'view_headers', 'loadYaml', 'loadConfig', 'simType'),
+    'data_processing': (
+        'lookup', 'measure_ac_parameters', 'measure_ac_parameters_batch', 'measure_stability_batch',
+        'ac_metrics', 'ac_table', 'ac_bode_plot', 'ac_analysis', 'stb_metrics', 'stb_table', 'stb_bode_plot',
+        'stb_analysis', 'compile_expression', 'evaluate_expressions', 'DeviceIndex', 'device_index',
+        'op_matrix', 'op_sweep', 'op_sweep_summary', 'op_sim', 'strip_column_number_suffix',
+        'assemble_sweep', 'concatenate_op_dataframes', 'get_fet', 'save_fet_vars'),
+    'plot_manager': ('PlotManager', 'minmax_decimate'),
+    'data_formating': ('save_table_html', 'save_table_txt', 'format_value'),
+    'spice_sim': ('SpiceSimulator', 'SpiceRunner', 'insertInclude', 'cornerMatrix', 'applyCorner', 'simCacheDir',
+                  'netlistDigest'),
+    'lookup_table': ('LookupTable',),
+    'interpolation': ('Interpolator', 'interpolate'),
+    'crossings': ('all_crossings', 'pad_crossings'),
+    'transient': ('crossing_times', 'measure_transient'),
+    'spectral': ('resample_uniform', 'power_spectrum', 'spectral_metrics', 'spectral_analysis'),
+}
+_LOCATIONS = {name: module for module, names in _EXPORTS.items() for name in names}
+__all__ = list(_LOCATIONS)
+
+
+def __getattr__(name):
+    if name.startswith('_'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name in _LOCATIONS:
+        value = getattr(importlib.import_module(_LOCATIONS[name]), name)
+    else:
+        # Anything else the modules used to star-export (np, pd, ...) is still found, in import order
+        for module in _MODULES:
+            module = importlib.import_module(module)
+            if hasattr(module, name):
+                value = getattr(module, name)
+                break
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LOCATIONS))
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def all_crossings(y, level, edge='both'):
+    """
+    Locate every crossing of level in every row of y.
+
+    Parameters:
+    y (np.ndarray): Curves of shape (C, F).
+    level (float or np.ndarray): Crossing level, scalar or one per curve.
+    edge (str): 'rise', 'fall' or 'both' directions.
+
+    Returns:
+    tuple: (rows, idx, frac, counts) where rows/idx/frac are flat arrays with one entry per crossing in
+    row-major order (the crossing lies between samples idx and idx + 1 at fraction frac) and counts
+    holds the number of crossings of each curve.
+    """
+    level = np.broadcast_to(np.asarray(level, dtype=float), (y.shape[0],))
+    above = y >= level[:, None]
+    if edge == 'rise':
+        cross = ~above[:, :-1] & above[:, 1:]
+    elif edge == 'fall':
+        cross = above[:, :-1] & ~above[:, 1:]
+    else:
+        cross = above[:, :-1] != above[:, 1:]
+    cross &= np.isfinite(y[:, :-1]) & np.isfinite(y[:, 1:])
+    rows, idx = np.nonzero(cross)
+    y0, y1 = y[rows, idx], y[rows, idx + 1]
+    frac = (level[rows] - y0) / (y1 - y0)
+    return rows, idx, frac, cross.sum(axis=1)
+
+
+def pad_crossings(values, rows, counts):
+    """Scatter flat per-crossing values into a NaN padded (C, max(counts)) array."""
+    padded = np.full((len(counts), counts.max(initial=0)), np.nan)
+    rank = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    padded[rows, rank] = values
+    return padded
@@ -1,41 +1,36 @@
 import numpy as np
 import pandas as pd
 import re
-from prettytable import PrettyTable 
-from plot_manager import PlotManager
+import ast
+import functools
+import weakref
 from file_readers import get_column_as_array
+from interpolation import interpolate
+from crossings import all_crossings, pad_crossings
 from data_formating import save_table_html,save_table_txt,format_value
 import os
 
 
         
 
-def lookup(lookup_array: np.ndarray, lookup_value: float, lookup_return_array: np.ndarray):
+def lookup(lookup_array: np.ndarray, lookup_value: float, lookup_return_array: np.ndarray, log_x: bool = False):
         """
         Perform a linear interpolation to find the corresponding value in lookup_return_array
         for a given lookup_value based on lookup_array.
 
+        lookup_array may be increasing, decreasing or non-monotonic (first crossing in array order), see
+        interpolation.Interpolator, which is also the way to reuse the preparation across many lookups.
+
         Parameters:
         lookup_array (np.ndarray): Array of x-values for the interpolation.
-        lookup_value (float): The x-value to look up.
+        lookup_value (float or np.ndarray): The x-value(s) to look up.
         lookup_return_array (np.ndarray): Array of y-values for the interpolation.
+        log_x (bool): Interpolate in log10 of the x-values, e.g. for frequency data.
 
         Returns:
-        float: Interpolated y-value corresponding to lookup_value.
+        float or np.ndarray: Interpolated y-value(s) corresponding to lookup_value.
         """
-        if not isinstance(lookup_array, np.ndarray):
-            raise TypeError("lookup_array must be a numpy array")
-        if not isinstance(lookup_return_array, np.ndarray):
-            raise TypeError("lookup_return_array must be a numpy array")
-        if not np.isscalar(lookup_value):
-            raise TypeError("lookup_value must be a scalar")
-        if len(lookup_array) != len(lookup_return_array):
-            raise ValueError("lookup_array and lookup_return_array must have the same length")
-        if len(lookup_array) < 2:
-            raise ValueError("lookup_array and lookup_return_array must have at least two elements")
-
-        # Perform the linear interpolation
-        return np.interp(lookup_value, lookup_array, lookup_return_array)
+        return interpolate(lookup_array, lookup_return_array, lookup_value, log_x=log_x)
 
 
 def measure_ac_parameters(frequencies, vout):
@@ -51,7 +46,7 @@ def measure_ac_parameters(frequencies, vout):
     A0_db = vout_db[idx_10Hz]
 
     # Unity gain frequency
-    ugf = np.interp(1, vout_mag[::-1], frequencies[::-1])
+    ugf = interpolate(vout_mag, frequencies, 1)
 
     # Find the index closest to the unity gain frequency
     idx_ugf = np.argmin(np.abs(frequencies - ugf))
@@ -109,138 +104,335 @@ print("BW_3dB:", BW_3dB)
 print("GBW:", GBW)
 '''
 
-def ac_analysis(df, save=False, output_file="ac_output", html=False):
-        freq = np.abs(get_column_as_array(df, 'frequency'))
-        vout_mag = get_column_as_array(df, 'v(vout)')
-        ac_parameters = measure_ac_parameters(freq, vout_mag)
-
-        vout_mag = ac_parameters.get("vout_mag", np.nan)
-        vout_db = ac_parameters.get("vout_db", np.nan)
-        A0 = ac_parameters.get("A0", np.nan)
-        A0_db = ac_parameters.get("A0_db", np.nan)
-        UGF = ac_parameters.get("UGF", np.nan)
-        PM = ac_parameters.get("PM", np.nan)
-        BW_3dB = ac_parameters.get("BW_3dB", np.nan)
-        GBW = ac_parameters.get("GBW", np.nan)
-        phase_rad = ac_parameters.get("phase", np.nan)
-        
-        # Create the table
-        table = PrettyTable()
-        table.field_names = ['A0', 'A0_db', 'BW', 'UGF', 'GBW', 'PM']
-        table.add_row([
-            format_value(A0),
-            format_value(A0_db),
-            format_value(BW_3dB),
-            format_value(abs(UGF)),
-            format_value(abs(GBW)),
-            format_value(abs(PM))
-        ])
-
-        # Convert the table to a string
-        table_str = table.get_string()
-
-        # Create the title with padding for centering
-        title = "Summary of AC Analysis"
-        table_width = len(table_str.splitlines()[0])
-        title_str = title.center(table_width)
-
-        # Print the title and the table
-        print()
-        print(title_str)
-        print(table_str)
-        print()
-        # Save the table if save is True
-        table_str = title_str + '\n'+ table_str
-        if save:
-            # Convert PrettyTable to DataFrame for HTML saving
-            table_data = {
-                'A0': [format_value(A0)],
-                'A0_db': [format_value(A0_db)],
-                'BW': [format_value(BW_3dB)],
-                'UGF': [format_value(abs(UGF))],
-                'GBW': [format_value(abs(GBW))],
-                'PM': [format_value(abs(PM))]
-            }
-            df_table = pd.DataFrame(table_data)
-            
-            if html:
-                save_table_html(df_table, output_file)
-            else:
-                save_table_txt(table_str, output_file)
-
-
-        pm = PlotManager(num_subplots=2, title="Bode Plot Example", xlabel="Frequency (Hz)", ylabels=["Gain (dB)", "Phase (rads)"], x_scale='log', y_scale='linear')
-        pm.bode_plot(frequency=freq, gain=vout_db, phase=phase_rad, bw_3dB=BW_3dB)
-        if save:
-            pm.save('AC_Analysis:Bode_Plot')
-        pm.show()
-        
-        
+def _first_crossings(x, y, level):
+    """
+    Locate the first downward crossing of level in every row of y.
+
+    Parameters:
+    x (np.ndarray): Shared x-axis of length F (e.g. log10 frequency).
+    y (np.ndarray): Curves of shape (C, F).
+    level (float or np.ndarray): Crossing level, scalar or one per curve.
 
-        return ac_parameters
+    Returns:
+    tuple: (x_cross, idx, frac, found) where x_cross is linearly interpolated between the bracketing
+    samples idx and idx + 1 (frac is the position between them) and is NaN for curves that never cross.
+    """
+    level = np.broadcast_to(np.asarray(level, dtype=float), (y.shape[0],))
+    above = y >= level[:, None]
+    down = above[:, :-1] & ~above[:, 1:]
+    idx = np.argmax(down, axis=1) if y.shape[1] > 1 else np.zeros(y.shape[0], dtype=int)
+    rows = np.arange(y.shape[0])
+    found = down[rows, idx] if y.shape[1] > 1 else np.zeros(y.shape[0], dtype=bool)
+
+    nxt = np.minimum(idx + 1, y.shape[1] - 1)
+    y0, y1 = y[rows, idx], y[rows, nxt]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.where(found, (level - y0) / (y1 - y0), 0.0)
+    x_cross = np.where(found, x[idx] + frac * (x[nxt] - x[idx]), np.nan)
+    return x_cross, idx, frac, found
+
+
+def _unwrapped_phase_at(phase, idx, frac):
+    """
+    Unwrapped phase (radians) of every row of phase at the fractional positions idx + frac.
 
-def stb_analysis(df, save=False, output_file="stb_output", html=False,tian_signal='tian_signal'):
-    def find_gain_crossover(freqs, lg_mag, lg_phase):
-        crossover_index = np.where(np.diff(np.sign(lg_mag)))[0]
-        gain_crossover_freq = freqs[crossover_index]
-        phase_at_zero_gain = lg_phase[crossover_index]
-        return gain_crossover_freq, phase_at_zero_gain
+    Only the wraps before idx are counted, which is much cheaper than unwrapping whole curves.
+    """
+    rows = np.arange(phase.shape[0])
+    if phase.shape[1] < 2:
+        return phase[rows, idx]
+    step = np.diff(phase, axis=1)
+    jumps = (step < -np.pi).astype(np.int8)
+    jumps -= step > np.pi
+    turns = np.sum(jumps, axis=1, where=np.arange(step.shape[1]) < idx[:, None])
 
-    def calculate_phase_margin(phase_at_zero_gain):
-        phase_at_zero_gain_degrees = np.degrees(phase_at_zero_gain)
-        PM = np.abs(180 - phase_at_zero_gain_degrees)
-        return PM
+    last = np.minimum(idx, step.shape[1] - 1)
+    local_step = step[rows, last]
+    local_step -= 2 * np.pi * np.round(local_step / (2 * np.pi))
+    return phase[rows, idx] + 2 * np.pi * turns + frac * local_step
 
-    def convert_db_to_magnitude(A0_db):
-        magnitude = 10 ** (A0_db / 20)
-        return magnitude
 
-    def calculate_gbw(A0_db, BW_3dB):
-        A0 = convert_db_to_magnitude(A0_db)
-        GBW = A0 * BW_3dB
-        return GBW
+def measure_ac_parameters_batch(frequencies, vout):
+    """
+    Measure A0, UGF, PM, BW and GBW of many AC transfer functions at once.
 
+    All curves share one frequency axis, so every metric is a whole-array operation. Crossing points
+    are interpolated between samples with gain in dB against log frequency, and the phase is unwrapped
+    along frequency, so phase margins beyond -180 degrees are reported correctly.
 
-    freq = np.abs(get_column_as_array(df, 'frequency'))
-    tian = get_column_as_array(df, tian_signal)
-    loop_gain_mag = np.abs(tian)
-    loop_gain_db = 20 * np.log10(loop_gain_mag)
-    phase = np.angle(tian, deg=False)
+    Parameters:
+    frequencies (np.ndarray): Frequency points, shape (F,).
+    vout (np.ndarray): Complex responses, shape (C, F) or (F,) for a single curve.
 
-    # fgx = get_column_as_array(df, 'gain_crossover_freq')
+    Returns:
+    dict: Arrays of shape (C,) for A0, A0_db, UGF, PM (degrees), BW_3dB (-3 dB frequency) and GBW.
+    Curves without a unity gain or -3 dB crossing get NaN for the dependent metrics.
+    """
+    frequencies = np.abs(np.asarray(frequencies))
+    vout = np.atleast_2d(vout)
+    log_f = np.log10(frequencies)
 
+    with np.errstate(divide='ignore'):
+        vout_db = 20 * np.log10(np.abs(vout))
 
-    idx_10Hz = np.argmin(np.abs(freq - 10))
-    A0_db = loop_gain_db[idx_10Hz]
+    idx_10Hz = np.argmin(np.abs(frequencies - 10))
+    A0_db = vout_db[:, idx_10Hz]
+    A0 = 10 ** (A0_db / 20)
 
-    # Calculate the 3 dB bandwidth
-    BW_3dB_freqs = freq[loop_gain_db >= (A0_db - 3)]
-    if len(BW_3dB_freqs) > 0:
-        BW_3dB = BW_3dB_freqs[-1] - BW_3dB_freqs[0]
+    log_ugf, idx, frac, found = _first_crossings(log_f, vout_db, 0.0)
+    phase_at_ugf = np.degrees(_unwrapped_phase_at(np.angle(vout), idx, frac))
+    PM = np.where(found, phase_at_ugf + 180, np.nan)
+
+    log_bw, _, _, _ = _first_crossings(log_f, vout_db, A0_db - 3)
+    BW_3dB = 10 ** log_bw
+
+    return {
+        "A0": A0,
+        "A0_db": A0_db,
+        "UGF": 10 ** log_ugf,
+        "PM": PM,
+        "BW_3dB": BW_3dB,
+        "GBW": A0 * BW_3dB,
+    }
+
+
+def _unwrap_phase(phase):
+    """Unwrap the phase (radians) of every row of phase along its last axis."""
+    step = np.diff(phase, axis=1)
+    jumps = (step < -np.pi).astype(np.int8)
+    jumps -= step > np.pi
+    unwrapped = phase.astype(float)
+    unwrapped[:, 1:] += 2 * np.pi * np.cumsum(jumps, axis=1, dtype=np.int32)
+    return unwrapped
+
+
+def _row_min(values):
+    """Smallest non-NaN value of every row, NaN for rows without any."""
+    smallest = np.min(np.where(np.isnan(values), np.inf, values), axis=1, initial=np.inf)
+    return np.where(np.isinf(smallest), np.nan, smallest)
+
+
+def measure_stability_batch(frequencies, loop_gain, critical_phase=None):
+    """
+    Measure the stability of one or many loop gains (e.g. tian_signal) at once.
+
+    Every gain crossover (|T| crossing 0 dB in either direction) and every phase crossover (T crossing
+    the critical phase) is reported, interpolated in dB and degrees against log frequency.
+
+    Unless given, the critical phase is taken from the phase at the peak of |T|, where the loop gain is
+    closest to its midband value: the multiple of 180 degrees lying 45 to 225 degrees below it. A loop
+    gain is thereby measured against -180 degrees from a peak phase between -135 and +45 degrees, which
+    covers up to 45 degrees of lead (AC coupling, a zero below the sweep start) and up to 135 degrees of
+    lag (dominant poles below the sweep start), and an inverted loop gain likewise against 0 degrees, so
+    both sign conventions of the probe give the same margins. Loop gains beyond those limits need an
+    explicit critical_phase.
+
+    Parameters:
+    frequencies (np.ndarray): Frequency points, shape (F,).
+    loop_gain (np.ndarray): Complex loop gains, shape (C, F) or (F,) for a single curve.
+    critical_phase (float or np.ndarray): Critical phase in degrees (-180 for T, 0 for -T), scalar or
+        one per curve, overriding the detection from the phase at peak gain.
+
+    Returns:
+    dict: Per curve arrays of shape (C,): A0_db, BW_3dB, GBW, PM (smallest phase margin), GM (smallest
+    gain margin in dB), num_gain_crossovers and num_phase_crossovers. Per crossing arrays of shape
+    (C, K), NaN padded to the largest crossover count K: gain_crossovers, phase_margins,
+    phase_crossovers and gain_margins. Metrics without a crossing are NaN.
+    """
+    frequencies = np.abs(np.asarray(frequencies))
+    loop_gain = np.atleast_2d(loop_gain)
+    log_f = np.log10(frequencies)
+
+    with np.errstate(divide='ignore'):
+        gain_db = 20 * np.log10(np.abs(loop_gain))
+    phase = np.degrees(_unwrap_phase(np.angle(loop_gain)))
+    if critical_phase is None:
+        peak = np.argmax(np.where(np.isnan(gain_db), -np.inf, gain_db), axis=1)
+        critical = 180 * np.floor((phase[np.arange(len(peak)), peak] - 45) / 180)
     else:
-        BW_3dB = None
+        critical = np.broadcast_to(np.asarray(critical_phase, dtype=float), (loop_gain.shape[0],))
 
-    # Calculate Gain-Bandwidth Product (GBW)
-    GBW = calculate_gbw(A0_db,BW_3dB)
+    idx_10Hz = np.argmin(np.abs(frequencies - 10))
+    A0_db = gain_db[:, idx_10Hz]
+    log_bw, _, _, _ = _first_crossings(log_f, gain_db, A0_db - 3)
+    BW_3dB = 10 ** log_bw
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rows, idx, frac, gain_counts = all_crossings(gain_db, 0.0)
+        log_fc = log_f[idx] + frac * (log_f[idx + 1] - log_f[idx])
+        phase_c = phase[rows, idx] + frac * (phase[rows, idx + 1] - phase[rows, idx])
+        gain_crossovers = pad_crossings(10 ** log_fc, rows, gain_counts)
+        phase_margins = pad_crossings(phase_c - critical[rows], rows, gain_counts)
+
+        # Every odd multiple of 180 degrees is a phase crossover, so fold the phase into [-180, 180)
+        # around the critical phase and drop the sign changes at the fold seams
+        folded = np.mod(phase - critical[:, None] + 180, 360) - 180
+        rows, idx, frac, _ = all_crossings(folded, 0.0)
+        seam = np.abs(folded[rows, idx + 1] - folded[rows, idx]) > 180
+        rows, idx, frac = rows[~seam], idx[~seam], frac[~seam]
+        phase_counts = np.bincount(rows, minlength=loop_gain.shape[0])
+        log_fp = log_f[idx] + frac * (log_f[idx + 1] - log_f[idx])
+        gain_p = gain_db[rows, idx] + frac * (gain_db[rows, idx + 1] - gain_db[rows, idx])
+        phase_crossovers = pad_crossings(10 ** log_fp, rows, phase_counts)
+        gain_margins = pad_crossings(-gain_p, rows, phase_counts)
+
+    return {
+        "A0_db": A0_db,
+        "BW_3dB": BW_3dB,
+        "GBW": 10 ** (A0_db / 20) * BW_3dB,
+        "PM": _row_min(phase_margins),
+        "GM": _row_min(gain_margins),
+        "num_gain_crossovers": gain_counts,
+        "num_phase_crossovers": phase_counts,
+        "gain_crossovers": gain_crossovers,
+        "phase_margins": phase_margins,
+        "phase_crossovers": phase_crossovers,
+        "gain_margins": gain_margins,
+    }
+
+
+def ac_metrics(df, vout='v(vout)'):
+    """
+    Compute the AC metrics of one simulation without any plotting or table rendering.
+
+    Parameters:
+    df (pd.DataFrame): AC plot with a 'frequency' column.
+    vout (str): Name of the output column.
+
+    Returns:
+    dict: The measure_ac_parameters results plus the 'frequency' axis they were computed on.
+    """
+    freq = np.abs(get_column_as_array(df, 'frequency'))
+    ac_parameters = measure_ac_parameters(freq, get_column_as_array(df, vout))
+    ac_parameters["frequency"] = freq
+    return ac_parameters
+
+
+def ac_table(ac_parameters, save=False, output_file="ac_output", html=False):
+    from prettytable import PrettyTable
+
+    A0 = ac_parameters.get("A0", np.nan)
+    A0_db = ac_parameters.get("A0_db", np.nan)
+    UGF = ac_parameters.get("UGF", np.nan)
+    PM = ac_parameters.get("PM", np.nan)
+    BW_3dB = ac_parameters.get("BW_3dB", np.nan)
+    GBW = ac_parameters.get("GBW", np.nan)
+
+    # Create the table
+    table = PrettyTable()
+    table.field_names = ['A0', 'A0_db', 'BW', 'UGF', 'GBW', 'PM']
+    table.add_row([
+        format_value(A0),
+        format_value(A0_db),
+        format_value(BW_3dB),
+        format_value(abs(UGF)),
+        format_value(abs(GBW)),
+        format_value(abs(PM))
+    ])
+
+    # Convert the table to a string
+    table_str = table.get_string()
+
+    # Create the title with padding for centering
+    title = "Summary of AC Analysis"
+    table_width = len(table_str.splitlines()[0])
+    title_str = title.center(table_width)
+
+    # Print the title and the table
+    print()
+    print(title_str)
+    print(table_str)
+    print()
+    # Save the table if save is True
+    table_str = title_str + '\n'+ table_str
+    if save:
+        # Convert PrettyTable to DataFrame for HTML saving
+        table_data = {
+            'A0': [format_value(A0)],
+            'A0_db': [format_value(A0_db)],
+            'BW': [format_value(BW_3dB)],
+            'UGF': [format_value(abs(UGF))],
+            'GBW': [format_value(abs(GBW))],
+            'PM': [format_value(abs(PM))]
+        }
+        df_table = pd.DataFrame(table_data)
+
+        if html:
+            save_table_html(df_table, output_file)
+        else:
+            save_table_txt(table_str, output_file)
+
+
+def ac_bode_plot(ac_parameters, save=False):
+    from plot_manager import PlotManager
 
-    fgx,phasegx = find_gain_crossover(freq,loop_gain_db,phase)
-    phase_margin = calculate_phase_margin(phasegx)
     pm = PlotManager(num_subplots=2, title="Bode Plot Example", xlabel="Frequency (Hz)", ylabels=["Gain (dB)", "Phase (rads)"], x_scale='log', y_scale='linear')
-    pm.bode_plot(frequency=freq, gain=loop_gain_db, phase=phase, bw_3dB=fgx[0],title='Loop Stability')
+    pm.bode_plot(frequency=ac_parameters["frequency"], gain=ac_parameters["vout_db"], phase=ac_parameters["phase"],
+                 bw_3dB=ac_parameters.get("BW_3dB", np.nan))
     if save:
-        pm.save('Loop_STB_Analysis')
+        pm.save('AC_Analysis:Bode_Plot')
     pm.show()
 
 
+def ac_analysis(df, save=False, output_file="ac_output", html=False, vout='v(vout)', table=True, plot=True):
+    """
+    AC analysis of one simulation. The summary table and the Bode plot are separate stages; pass
+    table=False and plot=False (or call ac_metrics) for a compute-only run, e.g. in batch regressions.
+    """
+    ac_parameters = ac_metrics(df, vout)
+    if table:
+        ac_table(ac_parameters, save, output_file, html)
+    if plot:
+        ac_bode_plot(ac_parameters, save)
+    return ac_parameters
+
+
+def stb_metrics(df, tian_signal='tian_signal', critical_phase=None):
+    """
+    Compute the loop stability metrics of one simulation without any plotting or table rendering.
+
+    Parameters:
+    df (pd.DataFrame): STB plot with a 'frequency' column.
+    tian_signal (str): Name of the loop gain column.
+    critical_phase (float): As in measure_stability_batch; detected from the phase at peak gain when None.
+
+    Returns:
+    dict: PM (margins at every gain crossover), A0, GBW and GM, the full measure_stability_batch
+    results under 'stability', and the 'frequency', 'loop_gain_db' and 'phase' curves.
+    """
+    freq = np.abs(get_column_as_array(df, 'frequency'))
+    tian = get_column_as_array(df, tian_signal)
+    with np.errstate(divide='ignore'):
+        loop_gain_db = 20 * np.log10(np.abs(tian))
+
+    stability = {name: values[0] for name, values in measure_stability_batch(freq, tian, critical_phase).items()}
+    return {'PM': stability['phase_margins'],
+            'A0' : stability['A0_db'],
+            'GBW' : stability['GBW'],
+            'GM' : stability['GM'],
+            'stability' : stability,
+            'frequency' : freq,
+            'loop_gain_db' : loop_gain_db,
+            'phase' : np.angle(tian, deg=False)}
+
+
+def stb_table(stb_parameters, save=False, output_file="stb_output", html=False):
+    from prettytable import PrettyTable
+
+    stability = stb_parameters['stability']
+    A0_db = stability['A0_db']
+    BW_3dB = stability['BW_3dB']
+    GBW = stability['GBW']
 
     # Create the table
     table = PrettyTable()
-    table.field_names = ['A0 dB', 'BW', 'GBW', 'PM']
+    table.field_names = ['A0 dB', 'BW', 'GBW', 'PM', 'GM']
     table.add_row([
         format_value(A0_db),
         format_value(BW_3dB),
         format_value(abs(GBW)),
-        format_value(abs(phase_margin[0]))
+        format_value(stability['PM']),
+        format_value(stability['GM'])
     ])
 
     # Convert the table to a string
@@ -264,126 +456,437 @@ def stb_analysis(df, save=False, output_file="stb_output", html=False,tian_signa
             'A0_db': [format_value(A0_db)],
             'BW': [format_value(BW_3dB)],
             'GBW': [format_value(abs(GBW))],
-            'PM': [format_value(abs(phase_margin[0]))]
+            'PM': [format_value(stability['PM'])],
+            'GM': [format_value(stability['GM'])]
         }
         df_table = pd.DataFrame(table_data)
-        
+
         if html:
             save_table_html(df_table, output_file)
         else:
             save_table_txt(table_str, output_file)
 
-    return {'PM': phase_margin,
-            'A0' : A0_db,
-            'GBW' : GBW }
 
-def op_sim(df, output_file='op_output', html=True, additional_vars=None, custom_expressions=None):
+def stb_bode_plot(stb_parameters, save=False):
+    from plot_manager import PlotManager
+
+    fgx = stb_parameters['stability']['gain_crossovers']
+    pm = PlotManager(num_subplots=2, title="Bode Plot Example", xlabel="Frequency (Hz)", ylabels=["Gain (dB)", "Phase (rads)"], x_scale='log', y_scale='linear')
+    pm.bode_plot(frequency=stb_parameters['frequency'], gain=stb_parameters['loop_gain_db'], phase=stb_parameters['phase'],
+                 bw_3dB=fgx[0] if len(fgx) else np.nan, title='Loop Stability')
+    if save:
+        pm.save('Loop_STB_Analysis')
+    pm.show()
+
+
+def stb_analysis(df, save=False, output_file="stb_output", html=False,tian_signal='tian_signal', table=True, plot=True,
+                 critical_phase=None):
     """
-    Automates the process of extracting required columns from the DataFrame, calculating gm/id and vstar,
-    and displaying the results in a formatted table using PrettyTable.
+    Loop stability analysis of one simulation. The Bode plot and the summary table are separate stages;
+    pass plot=False and table=False (or call stb_metrics) for a compute-only run.
+    """
+    stb_parameters = stb_metrics(df, tian_signal, critical_phase)
+    if plot:
+        stb_bode_plot(stb_parameters, save)
+    if table:
+        stb_table(stb_parameters, save, output_file, html)
+    return stb_parameters
+
+
+_EXPRESSION_FUNCTIONS = {name: getattr(np, name) for name in (
+    'abs', 'sqrt', 'exp', 'log', 'log10', 'log2', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan',
+    'arctan2', 'sinh', 'cosh', 'tanh', 'hypot', 'minimum', 'maximum', 'where', 'sign', 'floor', 'ceil',
+    'real', 'imag', 'angle', 'conj')}
+_EXPRESSION_CONSTANTS = {'pi': np.pi, 'e': np.e}
+_EXPRESSION_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+                     ast.Compare, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+                     ast.UAdd, ast.USub, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_expression(expr):
+    """
+    Parse, validate and compile an arithmetic expression such as 'gm*ro' or 'sqrt(cgs**2 + cgd**2)'.
+
+    Only arithmetic, comparisons, numeric constants, variable names and the numpy functions in
+    _EXPRESSION_FUNCTIONS are accepted. Compiled expressions are cached, so each distinct expression
+    is parsed once per session.
+
+    Returns:
+    tuple: (code object, frozenset of the variable names the expression reads)
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression '{expr}': {e.msg}")
+
+    called = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _EXPRESSION_NODES):
+            raise ValueError(f"Unsupported syntax '{type(node).__name__}' in expression '{expr}'")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, complex)):
+            raise ValueError(f"Unsupported constant {node.value!r} in expression '{expr}'")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in _EXPRESSION_FUNCTIONS:
+                raise ValueError(f"Unsupported function call in expression '{expr}', "
+                                 f"available functions: {', '.join(_EXPRESSION_FUNCTIONS)}")
+            called.add(id(node.func))
+
+    names = frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and id(node) not in called)
+    return compile(tree, f'<expression {expr}>', 'eval'), names
+
+
+def evaluate_expressions(expressions, variables, labels=None):
+    """
+    Evaluate compiled expressions over whole arrays at once.
+
+    Parameters:
+    ----------
+    expressions : dict
+        Expressions keyed by result name, e.g. {"Avi": "gm*ro", "Cgg": "cgb+cgs+cgd"}.
+    variables : dict
+        Arrays keyed by variable name, all of the same shape (e.g. devices x points). Characters that
+        are not valid in a Python name are replaced by '_', so 'gm/id' is available as gm_id.
+    labels : list
+        Name of each entry along the first axis (e.g. the transistors), used to report invalid results.
+
+    Returns:
+    -------
+    tuple
+        (results, invalid): the result array of each expression, and for each expression the labels
+        (or indices) whose results are not finite.
+    """
+    namespace = {re.sub(r'\W', '_', name): value for name, value in variables.items()}
+    shape = np.broadcast_shapes(*[np.shape(value) for value in namespace.values()])
+
+    results = {}
+    invalid = {}
+    for expr_name, expr in expressions.items():
+        code, names = compile_expression(expr)
+        missing = names - namespace.keys() - _EXPRESSION_CONSTANTS.keys()
+        if missing:
+            raise ValueError(f"Expression '{expr_name}' uses unknown variables: {', '.join(sorted(missing))}")
+
+        with np.errstate(all='ignore'):
+            result = eval(code, {"__builtins__": {}}, {**_EXPRESSION_FUNCTIONS, **_EXPRESSION_CONSTANTS, **namespace})
+        results[expr_name] = np.broadcast_to(result, shape)
+
+        bad = ~np.isfinite(results[expr_name]).reshape(shape[0], int(np.prod(shape[1:]))).all(axis=1) if shape else []
+        invalid[expr_name] = [labels[i] if labels is not None else i for i in np.flatnonzero(bad)]
+
+    return results, invalid
+
+
+class DeviceIndex:
+    """
+    Index of the device parameter columns of a DataFrame or raw file, built in a single pass.
+
+    Column names such as '@m.x1.xm2.msky130_fd_pr__nfet_01v8[gm]' (optionally wrapped as v(...) or
+    i(...)) are split into the device path '@m.x1.xm2.msky130_fd_pr__nfet_01v8' and the parameter 'gm'.
+    Devices are stored in a trie over the '.' separated hierarchy, so all devices below a subcircuit
+    are found without scanning the column names again.
+    """
+
+    _pattern = re.compile(r'(@m(?:\.\w+)+)\.(\w+)(?:\[([^\]]+)\])?')
+
+    def __init__(self, columns):
+        self.column_names = list(columns)
+        self._devices = {}
+        self._trie = {}
+
+        for position, col in enumerate(self.column_names):
+            match = self._pattern.search(col)
+            if not match:
+                continue
+            device = f"{match.group(1)}.{match.group(2)}"
+            if device not in self._devices:
+                self._devices[device] = {}
+                node = self._trie
+                for component in device.split('.'):
+                    node = node.setdefault(component, {})
+                node[None] = device
+            if match.group(3) is not None:
+                self._devices[device][match.group(3)] = position
+
+    def devices(self, prefix=None):
+        """
+        Return the device paths in column order, optionally only those below a hierarchy prefix such
+        as '@m.x1' or 'x1'.
+        """
+        if prefix is None:
+            return list(self._devices)
+
+        components = prefix.split('.')
+        if components[0] != '@m':
+            components.insert(0, '@m')
+        node = self._trie
+        for component in components:
+            if component not in node:
+                return []
+            node = node[component]
+
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if None in node:
+                found.append(node[None])
+            stack.extend(child for key, child in reversed(list(node.items())) if key is not None)
+        return found
+
+    def parameters(self, device):
+        """Return {parameter: column position} for one device path."""
+        return self._devices[device]
+
+    def columns(self, parameter, prefix=None):
+        """
+        Return {instance path: column name} of one parameter for every device that has it, where the
+        instance path drops the model name (e.g. '@m.x1.xm2'), as used for the op_sim table headers.
+        """
+        return {device.rsplit('.', 1)[0]: self.column_names[self._devices[device][parameter]]
+                for device in self.devices(prefix) if parameter in self._devices[device]}
+
+
+_DEVICE_INDEX_CACHE = {}
+
+
+def device_index(columns):
+    """
+    Return the DeviceIndex of a DataFrame (or its columns), building it only the first time.
+
+    The index is cached against the DataFrame's columns object, which row slices of the DataFrame
+    share, so repeated analyses of the same data never rescan the column names. Lists of names are
+    indexed on every call.
+    """
+    if isinstance(columns, pd.DataFrame):
+        columns = columns.columns
+    if not isinstance(columns, pd.Index):
+        return DeviceIndex(columns)
+
+    key = id(columns)
+    cached = _DEVICE_INDEX_CACHE.get(key)
+    if cached is not None and cached[0]() is columns:
+        return cached[1]
+
+    index = DeviceIndex(columns)
+    _DEVICE_INDEX_CACHE[key] = (weakref.ref(columns, lambda _: _DEVICE_INDEX_CACHE.pop(key, None)), index)
+    return index
+
+
+def _parse_op_columns(columns, variables):
+    """
+    Map each device parameter column onto its transistor.
+
+    Returns a dict {variable: {transistor path: column name}}, e.g. the column
+    '@m.xm1.msky130_fd_pr__nfet_01v8[gm]' is found under parsed['gm']['@m.xm1'].
+    """
+    index = device_index(columns)
+    return {var: index.columns(var) for var in variables}
+
+
+def op_matrix(df, additional_vars=None, custom_expressions=None):
+    """
+    Compute the DC OP parameters of every transistor as one dense array.
+
+    Device columns are located once and gathered into a (transistor x parameter x point) array; the
+    derived gm/id, v_star and ro rows and the custom expressions are then whole-array operations, so
+    the cost grows with the data size rather than with per-device Python work.
 
     Parameters:
     ----------
     df : DataFrame
-        The DataFrame containing the columns to be processed.
-    output_file : str
-        The name of the output file to save the table.
-    html : bool
-        Whether to save the table as an HTML file.
+        The DataFrame containing the device parameter columns.
     additional_vars : list
-        List of additional variables to include in the processing.
+        Additional device variables to extract besides vds, vdsat, gm, id, vth and gds.
     custom_expressions : dict
-        Dictionary of custom expressions to evaluate, with the key as the name of the expression and the value as the expression string.
+        Custom expressions to evaluate, keyed by name, e.g. {"Avi": "gm*ro"}. See compile_expression
+        for the accepted syntax; gm/id is available as gm_id. Invalid expressions raise ValueError and
+        devices with non-finite results are reported.
 
     Returns:
     -------
-    None
-        Prints the PrettyTable containing the gm/id and Vstar and other DC OP Parameters values for each transistor.
+    tuple
+        (values, transistors, parameters) where values has shape
+        (len(transistors), len(parameters), len(df)) and holds NaN for missing columns.
     """
-    # Define the column parsing function
-    def parse_columns(columns, variables):
-        parsed_columns = {var: {} for var in variables}
+    default_variables = ['vds', 'vdsat', 'gm', 'id', 'vth', 'gds']
+    variables = sorted(set(default_variables + (additional_vars or [])))
 
-        pattern = re.compile(r'\[([^\]]+)\]')
-        hierarchy_pattern = re.compile(r'(@m(?:\.\w+)+)\.(\w+)')  # Generalized pattern
+    parsed_columns = _parse_op_columns(df.columns, variables)
+    transistors = sorted(set(num for var_dict in parsed_columns.values() for num in var_dict.keys()))
 
-        for col in columns:
-            matches = pattern.findall(col)
-            if matches:
-                var_name = matches[0]
-                if var_name in variables:
-                    # Extract the full path and transistor number (e.g., @m.xm1.msky130_fd_pr__nfet_01v8)
-                    hierarchy_match = hierarchy_pattern.search(col)
-                    if hierarchy_match:
-                        full_path = hierarchy_match.group(1)
-                        parsed_columns[var_name][full_path] = col
+    derived_variables = []
+    if 'gm' in variables and 'id' in variables:
+        derived_variables += ['gm/id', 'v_star']
+    if 'gds' in variables:
+        derived_variables.append('ro')
+    parameters = variables + derived_variables + list(custom_expressions or {})
+
+    values = np.full((len(transistors), len(parameters), len(df)), np.nan)
+
+    # Gather every present column with a single take and scatter it into its (transistor, parameter) slot
+    t_index = {num: i for i, num in enumerate(transistors)}
+    slots = [(t_index[num], p, col) for p, var in enumerate(variables) for num, col in parsed_columns[var].items()]
+    if slots:
+        t_idx, p_idx, cols = zip(*slots)
+        block = df.iloc[:, df.columns.get_indexer(cols)].to_numpy(dtype=float)
+        values[list(t_idx), list(p_idx), :] = block.T
+
+    def param(name):
+        return values[:, parameters.index(name), :]
+
+    def divide(numerator, denominator):
+        return np.divide(numerator, denominator, out=np.full_like(numerator, np.nan), where=denominator != 0)
+
+    if 'gm/id' in derived_variables:
+        param('gm/id')[:] = divide(param('gm'), param('id'))
+        param('v_star')[:] = divide(2 * param('id'), param('gm'))
+    if 'ro' in derived_variables:
+        param('ro')[:] = divide(np.ones_like(param('gds')), param('gds'))
+
+    # Expressions see every transistor at once, so each one is evaluated a single time
+    local_vars = {name: param(name) for name in variables + derived_variables}
+    results, invalid = evaluate_expressions(custom_expressions or {}, local_vars, transistors)
+    for expr_name, result in results.items():
+        param(expr_name)[:] = result
+        if invalid[expr_name]:
+            shown = ', '.join(invalid[expr_name][:10]) + (' ...' if len(invalid[expr_name]) > 10 else '')
+            print(f"Warning: custom expression '{expr_name}' is not finite for {len(invalid[expr_name])} device(s): {shown}")
+
+    return values, transistors, parameters
+
+
+def _sweep_values(df, sweep):
+    if sweep is None:
+        return 'point', np.arange(len(df))
+    if isinstance(sweep, str):
+        return sweep, get_column_as_array(df, sweep).real
+    sweep = np.asarray(sweep)
+    if len(sweep) != len(df):
+        raise ValueError(f"sweep has {len(sweep)} values but the DataFrame has {len(df)} points")
+    return 'sweep', sweep
+
+
+def op_sweep(df, additional_vars=None, custom_expressions=None, sweep=None):
+    """
+    Evaluate the default, derived and custom OP parameters at every sweep point in one batched pass.
 
-        return parsed_columns
+    Use this for DC sweeps or for L sweeps assembled with assemble_sweep instead of looping over
+    op_sim; op_matrix returns the same data as a (transistor x parameter x point) array.
 
-    # Default variables
-    default_variables = ['vds', 'vdsat', 'gm', 'id', 'vth', 'gds']
-    # Merge default variables with additional ones
-    if additional_vars:
-        variables = list(set(default_variables + additional_vars))
-    else:
-        variables = default_variables
+    Parameters:
+    ----------
+    df : DataFrame
+        The DataFrame holding one row per sweep point.
+    additional_vars : list
+        Additional device variables, as in op_sim.
+    custom_expressions : dict
+        Custom expressions, as in op_sim.
+    sweep : str or array-like
+        Column name (e.g. 'v-sweep' or the 'sweep' column of assemble_sweep) or values of the swept
+        quantity. Defaults to the point index.
 
-    # Extract the required columns using the parse_columns function
-    columns = df.columns
-    parsed_columns = parse_columns(columns, variables)
+    Returns:
+    -------
+    DataFrame
+        Long format table with columns transistor, parameter, the sweep column and value.
+    """
+    values, transistors, parameters = op_matrix(df, additional_vars, custom_expressions)
+    sweep_name, sweep_values = _sweep_values(df, sweep)
+    num_t, num_p, num_points = values.shape
 
-    # Function to get column as array or NaN if column is missing
-    def get_column_as_array(df, col_name):
-        return df[col_name].values if col_name in df else np.nan
+    return pd.DataFrame({
+        'transistor': pd.Categorical.from_codes(np.repeat(np.arange(num_t), num_p * num_points), transistors),
+        'parameter': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(num_p), num_points), num_t), parameters),
+        sweep_name: np.tile(sweep_values, num_t * num_p),
+        'value': values.ravel(),
+    })
 
-    
 
-    # Get all transistor numbers
-    all_transistors = sorted(set(num for var_dict in parsed_columns.values() for num in var_dict.keys()))
+def op_sweep_summary(df, additional_vars=None, custom_expressions=None, sweep=None, target=None):
+    """
+    Summarize every OP parameter of every transistor over a sweep without rendering per-point tables.
 
-    # Extract arrays for each transistor and each variable
-    data = {var: {num: get_column_as_array(df, parsed_columns[var].get(num, None)) for num in all_transistors} for var in variables}
+    Parameters:
+    ----------
+    df, additional_vars, custom_expressions, sweep :
+        As in op_sweep.
+    target : float
+        Sweep value at which to linearly interpolate every parameter (e.g. L=0.5u). The sweep must be
+        monotonic.
 
-    # Calculate derived parameters gm/id, v_star, ro if they are part of the variables
+    Returns:
+    -------
+    DataFrame
+        Indexed by (transistor, parameter) with min, max, the sweep values where they occur and, when
+        target is given, the interpolated value at_target.
+    """
+    values, transistors, parameters = op_matrix(df, additional_vars, custom_expressions)
+    sweep_name, sweep_values = _sweep_values(df, sweep)
+    all_nan = np.isnan(values).all(axis=2)
+
+    with np.errstate(invalid='ignore'):
+        idx_min = np.argmin(np.where(np.isnan(values), np.inf, values), axis=2)
+        idx_max = np.argmax(np.where(np.isnan(values), -np.inf, values), axis=2)
+
+    def take(idx):
+        return np.where(all_nan, np.nan, np.take_along_axis(values, idx[..., None], axis=2)[..., 0])
+
+    summary = {
+        'min': take(idx_min),
+        'max': take(idx_max),
+        f'{sweep_name}_at_min': np.where(all_nan, np.nan, sweep_values[idx_min]),
+        f'{sweep_name}_at_max': np.where(all_nan, np.nan, sweep_values[idx_max]),
+    }
 
-    derived_variables = ['gm/id', 'v_star', 'ro']
-    derived_params = {}
+    if target is not None:
+        order = np.argsort(sweep_values)
+        if not (np.all(order == np.arange(len(order))) or np.all(order == np.arange(len(order))[::-1])):
+            raise ValueError("The sweep must be monotonic to interpolate at a target")
+        x = sweep_values[order]
+        if not x[0] <= target <= x[-1]:
+            raise ValueError(f"target {target} is outside the sweep range [{x[0]}, {x[-1]}]")
+        ordered = values[:, :, order]
+        if len(x) == 1:
+            summary['at_target'] = ordered[:, :, 0]
+        else:
+            hi = min(max(np.searchsorted(x, target), 1), len(x) - 1)
+            weight = (target - x[hi - 1]) / (x[hi] - x[hi - 1])
+            summary['at_target'] = ordered[:, :, hi - 1] * (1 - weight) + ordered[:, :, hi] * weight
 
-    if 'gm' in variables and 'id' in variables:
-        derived_params['gm/id'] = {
-            num: np.nan if np.isnan(data['gm'][num]).all() or np.isnan(data['id'][num]).all() or data['id'][num] == 0
-            else np.divide(data['gm'][num], data['id'][num], where=data['id'][num]!=0, out=np.full_like(data['gm'][num], np.nan))
-            for num in all_transistors
-        }
+    index = pd.MultiIndex.from_product([transistors, parameters], names=['transistor', 'parameter'])
+    return pd.DataFrame({name: column.ravel() for name, column in summary.items()}, index=index)
 
-    if 'gm' in variables and 'id' in variables:
-        derived_params['v_star'] = {
-            num: np.nan if np.isnan(data['gm'][num]).all() or np.isnan(data['id'][num]).all() or data['gm'][num] == 0
-            else np.divide(2 * data['id'][num], data['gm'][num], where=data['gm'][num]!=0, out=np.full_like(data['id'][num], np.nan))
-            for num in all_transistors
-        }
 
-    if 'gds' in variables:
-        derived_params['ro'] = {
-            num: np.nan if np.isnan(data['gds'][num]).all() or data['gds'][num] == 0
-            else np.divide(1, data['gds'][num], where=data['gds'][num]!=0, out=np.full_like(data['gds'][num], np.nan))
-            for num in all_transistors
-        }
+def op_sim(df, output_file='op_output', html=True, additional_vars=None, custom_expressions=None):
+    """
+    Automates the process of extracting required columns from the DataFrame, calculating gm/id and vstar,
+    and displaying the results in a formatted table using PrettyTable.
 
-    variables.sort()
-    # Evaluate custom expressions
-    custom_results = {}
-    if custom_expressions:
-        for expr_name, expr in custom_expressions.items():
-            custom_results[expr_name] = {}
-            for num in all_transistors:
-                local_vars = {var: data[var][num] for var in variables}
-                derived_vars = {var: derived_params[var][num] for var in derived_variables}
-                local_vars.update(derived_vars)
-                try:
-                    custom_results[expr_name][num] = eval(expr, {"__builtins__": None}, local_vars)
-                except Exception as e:
-                    custom_results[expr_name][num] = np.nan
+    Parameters:
+    ----------
+    df : DataFrame
+        The DataFrame containing the columns to be processed.
+    output_file : str
+        The name of the output file to save the table.
+    html : bool
+        Whether to save the table as an HTML file.
+    additional_vars : list
+        List of additional variables to include in the processing.
+    custom_expressions : dict
+        Dictionary of custom expressions to evaluate, with the key as the name of the expression and the value as the expression string.
+
+    Returns:
+    -------
+    None
+        Prints the PrettyTable containing the gm/id and Vstar and other DC OP Parameters values for each transistor.
+    """
+    from prettytable import PrettyTable
+
+    values, all_transistors, parameters = op_matrix(df, additional_vars, custom_expressions)
+
+    # Format every cell once; the printed, text and HTML tables all reuse the same strings
+    cells = [[format_value(val) for val in row] for row in values[:, :, 0].T]
 
     # Create a PrettyTable object
     table = PrettyTable()
@@ -391,17 +894,8 @@ def op_sim(df, output_file='op_output', html=True, additional_vars=None, custom_
     # Define headers
     table.field_names = ["Parameter"] + [f"{num}" for num in all_transistors]
 
-    # Add rows with formatted values
-    for var in variables:
-        table.add_row([var] + [format_value(data[var][num][0]) if not np.isnan(data[var][num]).all() else "NaN" for num in all_transistors])
-
-    # Add derived parameters to the table
-    for param, values in derived_params.items():
-        table.add_row([param] + [format_value(values[num][0]) if not np.isnan(values[num]).all() else "NaN" for num in all_transistors])
-
-    # Add custom expressions to the table
-    for expr_name, results in custom_results.items():
-        table.add_row([expr_name] + [format_value(results[num][0]) if not np.isnan(results[num]).all() else "NaN" for num in all_transistors])
+    for param, row in zip(parameters, cells):
+        table.add_row([param] + row)
 
     # Center align the columns
     table.align = "c"
@@ -410,15 +904,8 @@ def op_sim(df, output_file='op_output', html=True, additional_vars=None, custom_
     print(table)
 
     # Create a DataFrame to store the table data
-    table_data = {
-        "Parameter": variables + list(derived_params.keys()) + list(custom_results.keys())
-    }
-    for num in all_transistors:
-        table_data[num] = [format_value(data[var][num][0]) if not np.isnan(data[var][num]).all() else "NaN" for var in variables]
-        table_data[num].extend([format_value(derived_params[param][num][0]) if not np.isnan(derived_params[param][num]).all() else "NaN" for param in derived_params])
-        table_data[num].extend([format_value(custom_results[expr_name][num][0]) if not np.isnan(custom_results[expr_name][num]).all() else "NaN" for expr_name in custom_results])
-
-    df_table = pd.DataFrame(table_data)
+    df_table = pd.DataFrame(cells, columns=all_transistors)
+    df_table.insert(0, "Parameter", parameters)
 
     save_table_txt(table, output_file)
 
@@ -431,13 +918,76 @@ def strip_column_number_suffix(df):
     df.columns = [re.sub(r'\d+$', '', col) for col in df.columns]
     return df
 
+def _canonical_columns(df, i):
+    """Column names of df without duplicate suffixes, from the plot's basenames when recorded."""
+    basenames = df.attrs.get('basenames')
+    if isinstance(basenames, dict) and all(col in basenames for col in df.columns):
+        return [basenames[col] for col in df.columns]
+
+    # DataFrames not built by file_readers (or with renamed columns): strip trailing digits, refusing to
+    # merge distinct names
+    names = [re.sub(r'\d+$', '', col) for col in df.columns]
+    if len(set(names)) != len(names):
+        raise ValueError(f"DataFrame {i} has columns that only differ by a trailing number; build it with "
+                         "to_data_frames so the exact names of the raw file are known")
+    return names
+
+
+def assemble_sweep(dfs, sweep_values=None, sweep_name='sweep'):
+    """
+    Stack the DataFrames of an appended sweep (one plot per sweep point) into a single DataFrame.
+
+    Columns are matched by their canonical names, i.e. without the duplicate suffixes ng_raw_read adds to
+    repeated variable names, taken exactly from the basenames recorded by to_data_frames. Every plot is
+    copied into one preallocated array following the columns of the first DataFrame, so plots may list
+    their variables in any order but must all hold the variables of the first one.
+
+    Parameters:
+    ----------
+    dfs : list
+        DataFrames from to_data_frames, one per sweep point.
+    sweep_values : array-like
+        Value of the swept parameter for each DataFrame (e.g. the L values). Defaults to the sweep index.
+    sweep_name : str
+        Name of the column holding the sweep index or value.
+
+    Returns:
+    -------
+    DataFrame
+        One row per point with the sweep column first, e.g. df.filter(like='[gm]') gives gm vs sweep
+        for every transistor.
+    """
+    if not dfs:
+        raise ValueError("No DataFrames to assemble")
+
+    columns = _canonical_columns(dfs[0], 0)
+    takes = []
+    for i, df in enumerate(dfs):
+        positions = {name: idx for idx, name in reversed(list(enumerate(_canonical_columns(df, i))))}
+        missing = [name for name in columns if name not in positions]
+        if missing:
+            raise ValueError(f"DataFrame {i} is missing variables: {', '.join(missing)}")
+        takes.append([positions[name] for name in columns])
+
+    lengths = [len(df) for df in dfs]
+    data = np.empty((sum(lengths), len(columns)), dtype=np.result_type(*{dtype for df in dfs for dtype in df.dtypes}))
+    row = 0
+    for df, take, length in zip(dfs, takes, lengths):
+        block = df.to_numpy()
+        data[row:row + length] = block if take == list(range(block.shape[1])) else block[:, take]
+        row += length
+
+    sweep = np.arange(len(dfs)) if sweep_values is None else np.asarray(sweep_values)
+    if len(sweep) != len(dfs):
+        raise ValueError("sweep_values must have one value per DataFrame")
+
+    df_joined = pd.DataFrame(data, columns=columns, copy=False)
+    df_joined.insert(0, sweep_name, np.repeat(sweep, lengths))
+    return df_joined
+
+
 def concatenate_op_dataframes(dfs, column_name):
-    for i in range(len(dfs)):
-        dfs[i] = strip_column_number_suffix(dfs[i])
-    
-    # Concatenate the DataFrames along the rows
-    df_joined = pd.concat(dfs, axis=0, ignore_index=True)
-    return df_joined[column_name]
+    return assemble_sweep(dfs)[column_name]
 
 ''' 
 Example conttrol block to use with this 
@@ -463,17 +1013,8 @@ end
  '''
 
 def get_fet(columns):
-    # Pattern to extract the transistor name with hierarchy
-    hierarchy_pattern = re.compile(r'(@m(?:\.\w+)+\.\w+)')
-    
-    transistors = set()  # Use a set to avoid duplicates
-
-    for col in columns:
-        hierarchy_match = hierarchy_pattern.search(col)
-        if hierarchy_match:
-            transistors.add(hierarchy_match.group(1))
-    
-    return list(transistors)
+    # Device paths with hierarchy, e.g. @m.x1.xm1.msky130_fd_pr__nfet_01v8, from the cached device index
+    return device_index(columns).devices()
 
 
 def save_fet_vars(columns, variables, savefilename):
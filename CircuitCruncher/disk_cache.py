@@ -0,0 +1,33 @@
+import os
+import shutil
+
+
+def cache_entries(cache_dir: str) -> 'list[tuple[str, float, int]]':
+    """
+    Entries of an on-disk cache made of one directory per entry, whose modification time marks its
+    last use. Directories starting with '.' are entries still being written and are skipped.
+
+    Returns:
+    list: (path, last use, size in bytes) for every entry, least recently used first.
+    """
+    entries = []
+    for key in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+        path = os.path.join(cache_dir, key)
+        if not os.path.isdir(path) or key.startswith('.'):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        entries.append((path, os.path.getmtime(path), size))
+    return sorted(entries, key=lambda entry: entry[1])
+
+
+def evict_cache(cache_dir: str, max_bytes: int, keep: str = None):
+    """Remove the least recently used entries of cache_dir until it holds at most max_bytes, sparing keep."""
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, _, size in entries)
+    for path, _, size in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
@@ -1,90 +1,793 @@
 from __future__ import division
+import os
+import re
+import fnmatch
+import glob
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import time
 import numpy as np
-import pandas as pd
-import yaml
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+from disk_cache import cache_entries, evict_cache
+
+if TYPE_CHECKING:
+    import pandas as pd  # Annotations only; pandas is imported where DataFrames are built
 
 BSIZE_SP = 512
 MDATA_LIST = [b'title', b'date', b'plotname', b'flags', b'no. variables',
               b'no. points', b'dimensions', b'command', b'option']
+_HEADER_START = re.compile(rb'\n[A-Za-z]')
+_HEADER_END = re.compile(rb'(?:Binary|Values):\r?\n', re.IGNORECASE)
 
-def ng_raw_read(fname: str) -> 'tuple[list[np.ndarray], list[dict]]':
-    with open(fname, 'rb') as fp:
-        arrs = []
-        plots = []
-        names = {}
-        plot = {}
-        index_suffix = 0
-
-        def read_metadata_line():
-            try:
-                return fp.readline(BSIZE_SP).split(b':', maxsplit=1)
-            except Exception as e:
-                raise IOError(f"Error reading file: {e}")
-
-        while True:
-            metadata = read_metadata_line()
-            if len(metadata) != 2:
-                break
-
-            key, value = metadata[0].lower(), metadata[1].strip()
-            plot[key] = value
-
-            if key == b'variables':
-                if b'no. variables' not in plot or b'no. points' not in plot:
-                    raise KeyError("Missing 'no. variables' or 'no. points' in metadata before 'variables' key.")
-
-                num_vars = int(plot[b'no. variables'])
-                num_points = int(plot[b'no. points'])
-                plot['varnames'] = []
-                plot['varunits'] = []
-
-                for var_index in range(num_vars):
-                    var_spec = fp.readline(BSIZE_SP).strip().decode('ascii').split()
-                    assert var_index == int(var_spec[0])
-
-                    var_name = var_spec[1]
-                    if var_name in names:
-                        var_name += str(index_suffix)
-                        index_suffix += 1
-                    names[var_name] = 1
-
-                    plot['varnames'].append(var_name)
-                    plot['varunits'].append(var_spec[2])
+def _read_metadata_line(fp):
+    try:
+        return fp.readline(BSIZE_SP).split(b':', maxsplit=1)
+    except Exception as e:
+        raise IOError(f"Error reading file: {e}")
+
+
+def _row_dtype(plot: dict) -> np.dtype:
+    dtype_formats = [np.complex_ if b'complex' in plot[b'flags'] else np.float_] * len(plot['varnames'])
+    return np.dtype({'names': plot['varnames'], 'formats': dtype_formats})
+
+
+def _skip_newline(fp):
+    # Some writers terminate the data block with a newline, others start the next plot right away
+    position = fp.tell()
+    if fp.read(1) != b'\n':
+        fp.seek(position)
+
+
+def _search_file(fp, regex: 're.Pattern', overlap: int = 16) -> int:
+    """Return the file position of the first match of regex after fp, or None, reading in chunks."""
+    position = fp.tell()
+    previous = b''
+    while True:
+        chunk = fp.read(1 << 20)
+        if not chunk:
+            return None
+        match = regex.search(previous + chunk)
+        if match:
+            return position - len(previous) + match.start()
+        position += len(chunk)
+        previous = chunk[-overlap:]
+
+
+def _ascii_block_end(fp) -> int:
+    """Return the file position where the ASCII data block starting at fp ends."""
+    # Value lines start with whitespace or a digit, the next plot's header with a letter
+    match = _search_file(fp, _HEADER_START)
+    return os.fstat(fp.fileno()).st_size if match is None else match + 1
+
+
+def _iter_plot_headers(fp, state: dict = None):
+    """
+    Parse the header of every plot in an open raw file.
+
+    Yields a plot metadata dict per plot with 'offset' (byte position of its data block), 'nbytes'
+    (block size) and 'format' ('binary' or 'ascii') added. The file is repositioned past the data
+    block when the generator resumes, so callers are free to read the block themselves or leave it
+    untouched. state carries the duplicate name bookkeeping when parsing resumes mid-file.
+    """
+    state = {'names': {}, 'index_suffix': 0} if state is None else state
+    names = state['names']
+    plot = {}
+
+    while True:
+        metadata = _read_metadata_line(fp)
+        if len(metadata) != 2:
+            break
+
+        key, value = metadata[0].lower(), metadata[1].strip()
+        plot[key] = value
+
+        if key == b'variables':
+            if b'no. variables' not in plot or b'no. points' not in plot:
+                raise KeyError("Missing 'no. variables' or 'no. points' in metadata before 'variables' key.")
+
+            num_vars = int(plot[b'no. variables'])
+            plot['varnames'] = []
+            plot['varunits'] = []
+            plot['basenames'] = []
+
+            for var_index in range(num_vars):
+                var_spec = fp.readline(BSIZE_SP).strip().decode('ascii').split()
+                assert var_index == int(var_spec[0])
+
+                var_name = var_spec[1]
+                if var_name in names:
+                    var_name += str(state['index_suffix'])
+                    state['index_suffix'] += 1
+                names[var_name] = 1
+
+                plot['varnames'].append(var_name)
+                plot['varunits'].append(var_spec[2])
+                plot['basenames'].append(var_spec[1])
+
+        if key in (b'binary', b'values'):
+            if b'flags' not in plot:
+                raise KeyError(f"Missing 'flags' in metadata before '{key.decode()}' key.")
 
+            offset = fp.tell()
+            plot['offset'] = offset
             if key == b'binary':
-                if b'flags' not in plot:
-                    raise KeyError("Missing 'flags' in metadata before 'binary' key.")
+                itemsize = _row_dtype(plot).itemsize
+                available = (os.fstat(fp.fileno()).st_size - offset) // itemsize
+                plot['format'] = 'binary'
+                plot['npoints'] = min(int(plot[b'no. points']), available)
+                plot['nbytes'] = plot['npoints'] * itemsize
+            else:
+                plot['format'] = 'ascii'
+                plot['npoints'] = int(plot[b'no. points'])
+                plot['nbytes'] = _ascii_block_end(fp) - offset
+                fp.seek(offset)
+
+            yield plot.copy()
+
+            fp.seek(offset + plot['nbytes'])
+            _skip_newline(fp)
+
+
+def _select_columns(varnames: 'list[str]', basenames: 'list[str]', columns: 'list[str]' = None,
+                    pattern: str = None) -> 'list[int]':
+    """
+    Return the positions of the variables matched by exact name or glob in columns, or by the
+    regular expression pattern. Names are matched both with and without the numeric suffix added to
+    duplicates, so a selection applies to every plot of an appended sweep. The scale vector (the
+    first variable) is always kept.
+    """
+    if columns is None and pattern is None:
+        return list(range(len(varnames)))
+
+    if isinstance(columns, str):
+        columns = [columns]
+    regex = re.compile(pattern) if pattern is not None else None
+    exact = set(columns or []) & (set(varnames) | set(basenames))
+    globs = [col for col in columns or [] if col not in exact]
+
+    def matches(name):
+        return (name in exact
+                or any(fnmatch.fnmatchcase(name, glob) for glob in globs)
+                or (regex is not None and regex.search(name) is not None))
+
+    return [0] + [idx for idx in range(1, len(varnames)) if matches(varnames[idx]) or matches(basenames[idx])]
+
+
+def _read_ascii_rows(fp, plot: dict) -> np.ndarray:
+    """Parse an ASCII 'Values:' block at fp into a (points, variables) array."""
+    import pandas as pd
+
+    text = fp.read(plot['nbytes'])
+    nvars = len(plot['varnames'])
+    is_complex = b'complex' in plot[b'flags']
+    if not text.strip():
+        return np.empty((0, nvars), dtype=np.complex_ if is_complex else np.float_)
+
+    # Every value sits on its own tab-indented line, the point index only prefixes the first one,
+    # so after splitting complex pairs the values are the columns after the first tab
+    values = pd.read_csv(io.BytesIO(text.replace(b',', b'\t')), sep='\t', header=None, engine='c',
+                         usecols=[1, 2] if is_complex else [1], dtype=np.float_,
+                         float_precision='high').to_numpy()
+    if is_complex:
+        values = np.ascontiguousarray(values).view(np.complex_)
+
+    npoints = min(plot['npoints'], len(values) // nvars)
+    return values[:npoints * nvars].reshape(npoints, nvars)
+
+
+def _read_rows(fp, plot: dict) -> np.ndarray:
+    """Read the data block at fp into a (points, variables) array."""
+    if plot['format'] == 'ascii':
+        return _read_ascii_rows(fp, plot)
+    base = _row_dtype(plot)[0]
+    return np.fromfile(fp, dtype=base, count=plot['npoints'] * len(plot['varnames'])).reshape(-1, len(plot['varnames']))
+
+
+def _records(rows: np.ndarray, names: 'list[str]') -> np.ndarray:
+    rows = np.ascontiguousarray(rows)
+    return rows.view(np.dtype({'names': names, 'formats': [rows.dtype] * len(names)})).reshape(len(rows))
+
+
+def _map_block(fname: str, plot: dict) -> np.ndarray:
+    if plot['npoints'] == 0:
+        return np.empty(0, dtype=_row_dtype(plot))
+    return np.memmap(fname, dtype=_row_dtype(plot), mode='r', offset=plot['offset'], shape=(plot['npoints'],))
+
+
+def _read_block(fp, fname: str, plot: dict, mmap: bool, selected: 'list[int]') -> np.ndarray:
+    if plot['format'] == 'ascii':
+        return _records(_read_ascii_rows(fp, plot)[:, selected], [plot['varnames'][idx] for idx in selected])
+
+    if len(selected) == len(plot['varnames']):
+        if mmap:
+            return _map_block(fname, plot)
+        return np.fromfile(fp, dtype=_row_dtype(plot), count=plot['npoints'])
 
-                dtype_formats = [np.complex_ if b'complex' in plot[b'flags'] else np.float_] * num_vars
-                row_dtype = np.dtype({'names': plot['varnames'], 'formats': dtype_formats})
-                arrs.append(np.fromfile(fp, dtype=row_dtype, count=num_points))
-                plots.append(plot.copy())
-                fp.readline()  # Skip the end-of-line character after the binary data
+    return _take_columns(_map_block(fname, plot), plot, selected, mmap)
+
+
+def _take_columns(block: np.ndarray, plot: dict, selected: 'list[int]', view: bool) -> np.ndarray:
+    names = [plot['varnames'][idx] for idx in selected]
+    if view:
+        return block[names]
+
+    # Gather the selected columns with one strided read over the row-major block
+    base = block.dtype[0]
+    arr = np.empty(len(block), dtype=np.dtype({'names': names, 'formats': [base] * len(names)}))
+    rows = np.asarray(block).view(base).reshape(len(block), len(plot['varnames']))
+    arr.view(base).reshape(len(block), len(names))[:] = rows[:, selected]
+    return arr
+
+
+def ng_raw_read(fname: str, mmap: bool = False, columns: 'list[str]' = None,
+                pattern: str = None) -> 'tuple[list[np.ndarray], list[dict]]':
+    """
+    Read every plot of an ngspice raw file, binary ('Binary:') or ASCII ('Values:').
+
+    Parameters:
+    fname (str): Path to the raw file.
+    mmap (bool): Return read-only np.memmap structured arrays instead of loading the data blocks into
+        memory. Only the header is parsed up front; pages are read when a column is accessed.
+        ASCII plots cannot be mapped and are always parsed into memory.
+    columns (list[str]): Variable names or glob patterns to load. Exact names take priority, so
+        names such as '@m.xm1.msky130_fd_pr__nfet_01v8[gm]' need no escaping; inside a glob, brackets
+        form a character class, so use '*[[]gm]' to match every '[gm]' vector.
+    pattern (str): Regular expression; variables it matches (re.search) are loaded as well.
+
+    Only matching variables are materialized when columns or pattern is given, plus the scale vector
+    (time, frequency, ...) which is always kept. The plot's 'varnames' and 'varunits' list the loaded
+    variables only; 'basenames' holds the same names without the suffix added to duplicates.
+
+    Returns:
+    tuple: (arrs, plots) with one structured array and one metadata dict per plot. Each metadata dict
+    also records the plot's data 'offset' and 'nbytes' in the file.
+    """
+    arrs = []
+    plots = []
+    with open(fname, 'rb') as fp:
+        for plot in _iter_plot_headers(fp):
+            arr, plot = _load_plot(fp, fname, plot, mmap, columns, pattern)
+            arrs.append(arr)
+            plots.append(plot)
 
     return arrs, plots
 
 
-def to_data_frames(ngarr: 'tuple[list[np.ndarray], list[dict]]') -> 'list[pd.DataFrame]':
+def _load_plot(fp, fname: str, plot: dict, mmap: bool, columns: 'list[str]',
+               pattern: str) -> 'tuple[np.ndarray, dict]':
+    # fp must be positioned at plot['offset']
+    plot = dict(plot)
+    selected = _select_columns(plot['varnames'], plot['basenames'], columns, pattern)
+    arr = _read_block(fp, fname, plot, mmap, selected)
+    for key in ('varnames', 'varunits', 'basenames'):
+        plot[key] = [plot[key][idx] for idx in selected]
+    return arr, plot
+
+
+def ng_raw_iter(fname: str, plotname=None, mmap: bool = False, columns: 'list[str]' = None,
+                pattern: str = None):
+    """
+    Iterate over the plots of a raw file one at a time.
+
+    Only the current plot is held in memory, which keeps `set appendwrite` sweeps with thousands of
+    appended plots at a bounded footprint.
+
+    Parameters:
+    fname (str): Path to the raw file.
+    plotname (str): Only yield plots with this simType alias or plotname; all plots when None.
+    mmap, columns, pattern: As in ng_raw_read.
+
+    Yields:
+    tuple: (arr, plot) for each plot, in file order.
+    """
+    with open(fname, 'rb') as fp:
+        for plot in _iter_plot_headers(fp):
+            if plotname is None or plot[b'plotname'] == _plotname(plotname):
+                yield _load_plot(fp, fname, plot, mmap, columns, pattern)
+
+
+def ng_raw_stack(fname: str, plotname='op', columns: 'list[str]' = None,
+                 pattern: str = None) -> 'tuple[np.ndarray, list[str]]':
+    """
+    Stream the matching plots of a raw file into one preallocated 2D array.
+
+    Meant for sweeps written with `set appendwrite`, e.g. one Operating Point plot per swept L:
+    row i holds sweep point i and columns follow the variables of the first plot. Plots are read one
+    at a time straight into their rows, so no per-plot arrays or DataFrames are built.
+
+    Parameters:
+    fname (str): Path to the raw file.
+    plotname (str): simType alias or plotname of the plots to stack; all plots when None.
+    columns, pattern: Variable selection as in ng_raw_read.
+
+    Returns:
+    tuple: (data, names) where data has shape (total points, variables) and names are the variable
+    names without the suffix added to duplicates.
+    """
+    plots = [plot for plot in ng_raw_index(fname) if plotname is None or plot[b'plotname'] == _plotname(plotname)]
+    if not plots:
+        raise ValueError(f"No plot named {plotname} in {fname}")
+
+    first = plots[0]
+    names = [first['basenames'][idx] for idx in _select_columns(first['varnames'], first['basenames'], columns, pattern)]
+    base = _row_dtype(first)[0]
+    data = np.empty((sum(plot['npoints'] for plot in plots), len(names)), dtype=base)
+
+    row = 0
+    with open(fname, 'rb') as fp:
+        for plot in plots:
+            positions = {name: idx for idx, name in reversed(list(enumerate(plot['basenames'])))}
+            missing = [name for name in names if name not in positions]
+            if missing:
+                raise ValueError(f"Plot at offset {plot['offset']} is missing variables: {', '.join(missing)}")
+
+            fp.seek(plot['offset'])
+            block = _read_rows(fp, plot)
+            data[row:row + len(block)] = block[:, [positions[name] for name in names]]
+            row += len(block)
+
+    return data[:row], names
+
+
+def _index_path(fname: str) -> str:
+    return fname + '.index.json'
+
+
+def _source_stamp(fname: str) -> dict:
+    stat = os.stat(fname)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _encode_plot(plot: dict) -> dict:
+    return {'metadata': {key.decode('latin-1'): value.decode('latin-1') for key, value in plot.items() if isinstance(key, bytes)},
+            **{key: value for key, value in plot.items() if isinstance(key, str)}}
+
+
+def _decode_plot(entry: dict) -> dict:
+    plot = {key.encode('latin-1'): value.encode('latin-1') for key, value in entry['metadata'].items()}
+    plot.update({key: value for key, value in entry.items() if key != 'metadata'})
+    return plot
+
+
+def ng_raw_index(fname: str, sidecar: bool = False) -> 'list[dict]':
+    """
+    Scan the plot headers of a raw file without reading any data block.
+
+    Each entry is the metadata dict ng_raw_read would return for that plot (b'plotname', b'flags',
+    'varnames', 'offset', 'npoints', 'nbytes', ...), so it can be passed to simType or ng_raw_read_plot.
+
+    Parameters:
+    fname (str): Path to the raw file.
+    sidecar (bool): Persist the index next to the raw file as '<fname>.index.json' and reuse it while
+        the raw file's size and modification time are unchanged.
+
+    Returns:
+    list[dict]: One metadata dict per plot, in file order.
+    """
+    if sidecar and os.path.exists(_index_path(fname)):
+        with open(_index_path(fname), 'r') as index_file:
+            stored = json.load(index_file)
+        if stored.get('source') == _source_stamp(fname):
+            return [_decode_plot(entry) for entry in stored['plots']]
+
+    with open(fname, 'rb') as fp:
+        index = list(_iter_plot_headers(fp))
+
+    if sidecar:
+        try:
+            with open(_index_path(fname), 'w') as index_file:
+                json.dump({'source': _source_stamp(fname), 'plots': [_encode_plot(plot) for plot in index]}, index_file)
+        except OSError:
+            pass  # Read-only result directories still get the in-memory index
+
+    return index
+
+
+def ng_raw_read_plot(fname: str, name, index: 'list[dict]' = None, mmap: bool = False,
+                     columns: 'list[str]' = None, pattern: str = None) -> 'tuple[np.ndarray, dict]':
+    """
+    Load a single plot of a raw file, seeking straight to its data block.
+
+    Parameters:
+    fname (str): Path to the raw file.
+    name (str or int): Plot position in the file, a simType alias ('op', 'ac', 'dc', 'stb') or a
+        plotname such as 'AC Analysis'. The first matching plot is loaded.
+    index (list[dict]): Index from ng_raw_index; scanned from the file when omitted.
+    mmap, columns, pattern: As in ng_raw_read.
+
+    Returns:
+    tuple: (arr, plot) for the selected plot.
+    """
+    if index is None:
+        index = ng_raw_index(fname)
+
+    if isinstance(name, int):
+        plot = index[name]
+    else:
+        plot = index[simType(name, index)]
+
+    with open(fname, 'rb') as fp:
+        fp.seek(plot['offset'])
+        return _load_plot(fp, fname, plot, mmap, columns, pattern)
+
+
+def raw_cache_dir() -> str:
+    """Directory of the parsed raw file cache, $CIRCUITCRUNCHER_CACHE_DIR or ~/.cache/CircuitCruncher/raw."""
+    return os.environ.get('CIRCUITCRUNCHER_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'CircuitCruncher', 'raw'))
+
+
+def _cache_key(fname: str) -> str:
+    stamp = _source_stamp(fname)
+    source = f"{os.path.abspath(fname)}|{stamp['size']}|{stamp['mtime_ns']}"
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def ng_raw_read_cached(fname: str, mmap: bool = False, columns: 'list[str]' = None, pattern: str = None,
+                       cache_dir: str = None, max_bytes: int = 2 * 1024 ** 3) -> 'tuple[list[np.ndarray], list[dict]]':
+    """
+    ng_raw_read backed by a persistent cache of parsed plots.
+
+    The first read of a raw file stores every plot as a .npy file plus a JSON metadata file in a cache
+    entry keyed on the file's absolute path, size and modification time. Later reads load the .npy
+    files instead of parsing the raw file, memory mapped when mmap=True. A changed raw file gets a
+    new key, and the least recently used entries are evicted once the cache exceeds max_bytes.
+
+    Parameters:
+    fname (str): Path to the raw file.
+    mmap, columns, pattern: As in ng_raw_read.
+    cache_dir (str): Cache location; defaults to raw_cache_dir().
+    max_bytes (int): Size limit of the cache directory.
+
+    Returns:
+    tuple: (arrs, plots) as returned by ng_raw_read.
+    """
+    cache_dir = cache_dir or raw_cache_dir()
+    entry = os.path.join(cache_dir, _cache_key(fname))
+
+    if not os.path.isdir(entry):
+        os.makedirs(cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.', dir=cache_dir)
+        arrs, plots = ng_raw_read(fname, mmap=True)
+        for i, arr in enumerate(arrs):
+            np.save(os.path.join(staging, f'plot{i}.npy'), arr)
+        with open(os.path.join(staging, 'plots.json'), 'w') as meta_file:
+            json.dump({'source': os.path.abspath(fname), 'plots': [_encode_plot(plot) for plot in plots]}, meta_file)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)  # Another process cached the file first
+        evict_cache(cache_dir, max_bytes, keep=entry)
+
+    os.utime(entry)  # Mark as recently used for eviction
+    with open(os.path.join(entry, 'plots.json'), 'r') as meta_file:
+        stored = [_decode_plot(plot) for plot in json.load(meta_file)['plots']]
+
+    arrs = []
+    plots = []
+    for i, plot in enumerate(stored):
+        block = np.load(os.path.join(entry, f'plot{i}.npy'), mmap_mode='r' if mmap else None)
+        selected = _select_columns(plot['varnames'], plot['basenames'], columns, pattern)
+        if len(selected) < len(plot['varnames']):
+            block = _take_columns(block, plot, selected, mmap)
+            for key in ('varnames', 'varunits', 'basenames'):
+                plot[key] = [plot[key][idx] for idx in selected]
+        arrs.append(block)
+        plots.append(plot)
+
+    return arrs, plots
+
+
+def clear_raw_cache(fname: str = None, cache_dir: str = None):
+    """
+    Invalidate cached plots, either every entry stored for the raw file fname (whatever its size or
+    modification time was) or the whole cache when fname is None.
+    """
+    cache_dir = cache_dir or raw_cache_dir()
+    for path, _, _ in cache_entries(cache_dir):
+        if fname is not None:
+            with open(os.path.join(path, 'plots.json'), 'r') as meta_file:
+                if json.load(meta_file)['source'] != os.path.abspath(fname):
+                    continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _read_plot_frame(fname: str, plot, columns: 'list[str]', pattern: str) -> 'pd.DataFrame':
+    import pandas as pd
+
+    arr, plot = ng_raw_read_plot(fname, plot, columns=columns, pattern=pattern)
+    df = pd.DataFrame(data=arr, columns=plot['varnames']).set_axis(plot['basenames'], axis=1)
+    df.attrs['basenames'] = {name: name for name in plot['basenames']}
+    return df
+
+
+def ng_raw_read_many(files, plot=0, columns: 'list[str]' = None, pattern: str = None,
+                     max_workers: int = None) -> 'dict[str, pd.DataFrame]':
+    """
+    Load one plot from each of many raw files (PVT corners, Monte Carlo seeds, ...) in parallel.
+
+    Files are parsed across a process pool, so loading scales with the number of cores. Columns are
+    named without the duplicate suffixes of ng_raw_read and every DataFrame is reindexed to the same
+    column order (variables missing from a file are NaN), so the result can be stacked with
+    pd.concat(result, names=['file', 'point']).
+
+    Parameters:
+    files (str or list[str]): Glob pattern or list of raw file paths.
+    plot (int or str): Plot to load from each file, as in ng_raw_read_plot.
+    columns, pattern: Variable selection as in ng_raw_read.
+    max_workers (int): Number of worker processes; defaults to the CPU count. 1 reads serially.
+
+    Returns:
+    dict[str, DataFrame]: One DataFrame per file, keyed by path in input (or sorted glob) order.
+    """
+    files = sorted(glob.glob(files)) if isinstance(files, str) else list(files)
+    if not files:
+        return {}
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(files) == 1:
+        frames = [_read_plot_frame(fname, plot, columns, pattern) for fname in files]
+    else:
+        chunksize = max(1, len(files) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(_read_plot_frame, files, [plot] * len(files), [columns] * len(files),
+                                   [pattern] * len(files), chunksize=chunksize))
+
+    shared_columns = list(dict.fromkeys(name for frame in frames for name in frame.columns))
+    return {fname: frame.reindex(columns=shared_columns, copy=False) for fname, frame in zip(files, frames)}
+
+
+class RawFollower:
+    """
+    Follow a raw file that is still being written, e.g. by a long `ngspice -b -r` transient run.
+
+    Every poll() reads only the rows and plots appended since the previous poll. A plot whose
+    'No. Points' header still holds the placeholder ngspice patches at the end of the run is read up
+    to the last complete row; it is considered finished once the header is patched, and parsing then
+    moves on to the next plot. ASCII plots are parsed, and returned whole, only once their header is patched.
+    """
+
+    def __init__(self, fname: str, columns: 'list[str]' = None, pattern: str = None):
+        """
+        Parameters:
+        fname (str): Path to the raw file.
+        columns, pattern: Variable selection as in ng_raw_read.
+        """
+        self.fname = fname
+        self.columns = columns
+        self.pattern = pattern
+        self._header_offset = 0
+        self._rows = 0
+        self._ascii_nbytes = None
+        self._state = {'names': {}, 'index_suffix': 0}
+
+    def poll(self) -> 'list[tuple[np.ndarray, dict]]':
+        """
+        Read the data appended since the last poll.
+
+        Returns:
+        list: (arr, plot) pairs with the new rows of each plot, in file order. plot['start'] is the
+        index of the first returned row within its plot and plot['finished'] whether it is complete.
+        Every plot is reported exactly once with finished=True, with no rows if they were all returned
+        by earlier polls.
+        """
+        new_data = []
+        with open(self.fname, 'rb') as fp:
+            while True:
+                fp.seek(self._header_offset)
+                if _search_file(fp, _HEADER_END) is None:
+                    break  # The next header is not fully written yet
+
+                fp.seek(self._header_offset)
+                state = {'names': dict(self._state['names']), 'index_suffix': self._state['index_suffix']}
+                headers = _iter_plot_headers(fp, state)
+                plot = next(headers, None)
+                headers.close()
+                if plot is None:
+                    break
+
+                declared = int(plot[b'no. points'])
+                if plot['format'] == 'ascii':
+                    # ASCII values cannot be located without parsing the block, so it is parsed only once
+                    # the header holds the real point count, and again only when the block has grown
+                    rows = np.empty((0, len(plot['varnames'])))
+                    finished = False
+                    if declared > 0 and plot['nbytes'] != self._ascii_nbytes:
+                        self._ascii_nbytes = plot['nbytes']
+                        fp.seek(plot['offset'])
+                        rows = _read_ascii_rows(fp, plot)
+                        finished = declared <= len(rows)
+                        rows = rows[self._rows:] if finished else rows[:0]
+                    end = plot['offset'] + plot['nbytes']
+                else:
+                    itemsize = _row_dtype(plot).itemsize
+                    available = (os.fstat(fp.fileno()).st_size - plot['offset']) // itemsize
+                    finished = 0 < declared <= available
+                    total = declared if finished else available
+                    fp.seek(plot['offset'] + self._rows * itemsize)
+                    rows = np.fromfile(fp, dtype=_row_dtype(plot)[0], count=(total - self._rows) * len(plot['varnames']))
+                    rows = rows.reshape(-1, len(plot['varnames']))
+                    end = plot['offset'] + total * itemsize
+
+                if len(rows) or finished:
+                    # A plot finishing without new rows (all rows delivered before the header was
+                    # patched) still gets an empty entry carrying finished=True
+                    selected = _select_columns(plot['varnames'], plot['basenames'], self.columns, self.pattern)
+                    plot = dict(plot, start=self._rows, npoints=len(rows), finished=finished)
+                    arr = _records(rows[:, selected], [plot['varnames'][idx] for idx in selected])
+                    for key in ('varnames', 'varunits', 'basenames'):
+                        plot[key] = [plot[key][idx] for idx in selected]
+                    new_data.append((arr, plot))
+                    self._rows += len(rows)
+
+                if not finished:
+                    break
+
+                fp.seek(end)
+                _skip_newline(fp)
+                self._header_offset = fp.tell()
+                self._state = state
+                self._rows = 0
+                self._ascii_nbytes = None
+
+        return new_data
+
+
+def _guess_plotname(scale: str, npoints: int) -> bytes:
+    if scale.lower() == 'time':
+        return b'Transient Analysis'
+    if scale.lower() == 'frequency':
+        return b'AC Analysis'
+    return b'Operating Point' if npoints == 1 else b'DC transfer characteristic'
+
+
+def _guess_unit(name: str) -> str:
+    for prefix, unit in (('time', 'time'), ('frequency', 'frequency'), ('v(', 'voltage'), ('i(', 'current')):
+        if name.lower().startswith(prefix):
+            return unit
+    return 'notype'
+
+
+def _write_plot(fp, arr, plot: dict = None, chunk_rows: int = 1 << 16):
+    """Write one plot, a DataFrame or structured array, to fp as an ngspice binary plot."""
+    plot = plot or {}
+    if not isinstance(arr, np.ndarray):
+        names = [str(col) for col in arr.columns]
+        columns = [arr.iloc[:, i].to_numpy() for i in range(arr.shape[1])]
+    else:
+        names = list(arr.dtype.names)
+        columns = [arr[name] for name in names]
+
+    npoints = len(arr)
+    is_complex = any(np.iscomplexobj(col) for col in columns)
+    base = np.dtype(np.complex_ if is_complex else np.float_)
+
+    # Suffixed duplicate names are written under their original name so re-reading numbers them again
+    header_names = plot['basenames'] if len(plot.get('basenames', [])) == len(names) else names
+    units = plot['varunits'] if len(plot.get('varunits', [])) == len(names) else [_guess_unit(name) for name in names]
+
+    metadata = {key: value for key, value in plot.items() if key in MDATA_LIST}
+    metadata.setdefault(b'title', b'CircuitCruncher')
+    metadata.setdefault(b'date', time.strftime('%a %b %d %H:%M:%S  %Y').encode())
+    metadata.setdefault(b'plotname', _guess_plotname(names[0], npoints))
+    metadata[b'flags'] = b'complex' if is_complex else b'real'
+    metadata[b'no. variables'] = str(len(names)).encode()
+    metadata[b'no. points'] = str(npoints).encode()
+
+    lines = [key.decode().title().encode() + b': ' + metadata[key] for key in MDATA_LIST if key in metadata]
+    lines.append(b'Variables:')
+    lines += [f'\t{i}\t{name}\t{unit}'.encode() for i, (name, unit) in enumerate(zip(header_names, units))]
+    lines.append(b'Binary:')
+    fp.write(b'\n'.join(lines) + b'\n')
+
+    # Rows are assembled chunk by chunk, so mapped or strided inputs never load in full
+    chunk = np.empty((min(chunk_rows, npoints), len(names)), dtype=base)
+    for start in range(0, npoints, chunk_rows):
+        stop = min(start + chunk_rows, npoints)
+        for i, col in enumerate(columns):
+            chunk[:stop - start, i] = col[start:stop]
+        chunk[:stop - start].tofile(fp)
+
+
+def ng_raw_write(fname: str, arrs, plots=None, append: bool = False):
+    """
+    Write plots to an ngspice compatible binary raw file.
+
+    Parameters:
+    fname (str): Path of the raw file to write.
+    arrs: DataFrame or structured array, or a list of them with one entry per plot. The (arrs, plots)
+        returned by ng_raw_read round-trip unchanged.
+    plots (dict or list[dict]): Plot metadata as returned by ng_raw_read; title, date, plotname,
+        command and variable units are taken from it when present. The plotname otherwise follows
+        the scale vector ('time', 'frequency', ...) and units follow the variable names.
+    append (bool): Append the plots to an existing raw file, like ngspice's `set appendwrite`.
+
+    Plots holding any complex column are written as complex, all others as real.
+    """
+    if not isinstance(arrs, (list, tuple)):
+        arrs, plots = [arrs], [plots]
+    plots = plots if plots is not None else [None] * len(arrs)
+
+    with open(fname, 'ab' if append else 'wb') as fp:
+        for arr, plot in zip(arrs, plots):
+            _write_plot(fp, arr, plot)
+
+
+def ng_raw_extract(src: str, dst: str, plotname=None, columns: 'list[str]' = None, pattern: str = None,
+                   rows: slice = None):
+    """
+    Copy a subset of the plots, variables and points of a raw file into a new, smaller raw file.
+
+    The source is memory mapped and copied in chunks, so multi-GB files are never fully loaded.
+
+    Parameters:
+    src (str): Raw file to read.
+    dst (str): Raw file to write.
+    plotname (str): simType alias or plotname of the plots to keep; all plots when None.
+    columns, pattern: Variable selection as in ng_raw_read.
+    rows (slice): Points to keep from every plot, e.g. slice(None, None, 10) to decimate by 10.
+    """
+    with open(dst, 'wb') as fp:
+        for arr, plot in ng_raw_iter(src, plotname, mmap=True, columns=columns, pattern=pattern):
+            _write_plot(fp, arr if rows is None else arr[rows], plot)
+
+
+def _as_frame(arr: np.ndarray, varnames: 'list[str]', copy: bool = True) -> 'pd.DataFrame':
+    import pandas as pd
+
+    if copy:
+        return pd.DataFrame(data=arr, columns=varnames)
+
+    # All fields of a raw file plot share one dtype, so a packed record array is a plain 2D block
+    base = arr.dtype[0] if arr.dtype.names else arr.dtype
+    if arr.dtype.names and arr.dtype.itemsize == base.itemsize * len(arr.dtype.names):
+        block = np.asarray(arr).view(base).reshape(len(arr), len(arr.dtype.names))
+        return pd.DataFrame(data=block, columns=varnames, copy=False)
+    return pd.DataFrame({name: arr[name] for name in varnames}, columns=varnames, copy=False)
+
+
+def _plot_frame(arr: np.ndarray, plot: dict, copy: bool = True) -> 'pd.DataFrame':
+    """DataFrame of a plot keyed by varnames, with df.attrs['basenames'] mapping each varname to its basename."""
+    df = _as_frame(arr, plot['varnames'], copy)
+    df.attrs['basenames'] = dict(zip(plot['varnames'], plot.get('basenames', plot['varnames'])))
+    return df
+
+
+def to_data_frames(ngarr: 'tuple[list[np.ndarray], list[dict]]', copy: bool = True) -> 'list[pd.DataFrame]':
+    """
+    Wrap the arrays returned by ng_raw_read into DataFrames.
+
+    With copy=False the DataFrames are views of the arrays, so memory mapped plots from
+    ng_raw_read(fname, mmap=True) stay on disk until a column is read. Columns are the varnames of each
+    plot and df.attrs['basenames'] maps each of them to the same name without the suffix added to
+    duplicates.
+    """
     arrs, plots = ngarr
-    return [pd.DataFrame(data=arr, columns=plot['varnames']) for arr, plot in zip(arrs, plots)]
+    return [_plot_frame(arr, plot, copy) for arr, plot in zip(arrs, plots)]
 
-def to_data_frame(fraw: str) -> pd.DataFrame:
+def to_data_frame(fraw: str) -> 'pd.DataFrame':
     arrs, plots = ng_raw_read(fraw)
     if arrs:
-        return pd.DataFrame(data=arrs[0], columns=plots[0]['varnames'])
+        return _plot_frame(arrs[0], plots[0])
     return None
 
-def get_column_as_array(df: pd.DataFrame, column_name: str) -> np.ndarray:
+def get_column_as_array(df: 'pd.DataFrame', column_name: str) -> np.ndarray:
     if column_name not in df.columns:
         raise KeyError(f"Could not find name '{column_name}' in columns: {', '.join(df.columns)}")
     return df[column_name].values
 
 
-def view_headers(df: pd.DataFrame):
+def view_headers(df: 'pd.DataFrame'):
     print(df.columns)
 
 
 def loadYaml(config_name = 'config.yaml'):    
+    import yaml
+
     with open(config_name, 'r') as yaml_file:
         config = yaml.safe_load(yaml_file)
     return config
@@ -109,24 +812,23 @@ def loadConfig():
             "out_dir": output_dir  }  
 
 
-def simType(name,plots): 
-    def simAlias():
-        if name == 'ac':
-            return b'AC Analysis'
-        elif name == 'op':
-            return b'Operating Point'
-        elif name == 'dc':
-            return b'DC transfer characteristic'
-        elif name == 'stb':
-            return b'AC Analysis'
-        else:
-            pass
-
-    idx = 0
-    for plot in plots: 
-        if plot[b'plotname'] == simAlias():
-            return idx 
-        else:
-            idx = idx + 1
-    
-    raise NotImplementedError(f"Unsupported plot name {name}")
\ No newline at end of file
+SIM_ALIASES = {
+    'ac': b'AC Analysis',
+    'op': b'Operating Point',
+    'dc': b'DC transfer characteristic',
+    'stb': b'AC Analysis',
+}
+
+
+def _plotname(name) -> bytes:
+    return SIM_ALIASES.get(name, name.encode() if isinstance(name, str) else name)
+
+
+def simType(name, plots):
+    plotname = _plotname(name)
+
+    for idx, plot in enumerate(plots):
+        if plot[b'plotname'] == plotname:
+            return idx
+
+    raise NotImplementedError(f"Unsupported plot name {name}")
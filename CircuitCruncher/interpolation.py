@@ -0,0 +1,125 @@
+import numpy as np
+
+
+# Non-monotonic x with more runs than this is searched segment by segment with array operations
+_MAX_RUNS = 16
+# Query x segment comparisons evaluated at once by the segment search
+_CHUNK_ELEMENTS = 1 << 22
+
+
+class Interpolator:
+    """
+    Piecewise linear interpolation of y(x) for whole arrays of query values.
+
+    The segments are prepared once (binary search tables and slopes), so repeated queries against the
+    same x only cost a searchsorted. x does not have to be increasing:
+
+    - Decreasing x (e.g. a magnitude falling with frequency) is handled like increasing x.
+    - Non-monotonic x (e.g. a magnitude with peaking) is split into monotonic runs, and each query is
+      answered by the first run, in array order, whose range contains it: the first crossing. Noisy x
+      with many runs is instead scanned for the first segment containing each query, in chunks of
+      queries, without a Python loop over the runs.
+
+    Queries outside [min(x), max(x)] return left / right, which default to y at the smallest / largest x
+    like np.interp.
+    """
+
+    def __init__(self, x, y, log_x: bool = False, left=None, right=None):
+        """
+        :param x: Sample positions, shape (N,).
+        :param y: Sample values, shape (N,) or (C, N) for C curves sharing x.
+        :param log_x: Interpolate linearly in log10(x), e.g. for frequency data; x and queries must be positive.
+        :param left: Value for queries below min(x).
+        :param right: Value for queries above max(x).
+        """
+        x = np.asarray(x, dtype=float).reshape(-1)
+        y = np.asarray(y)
+        if y.shape[-1] != len(x):
+            raise ValueError("x and y must have the same length")
+        if len(x) < 2:
+            raise ValueError("x and y must have at least two elements")
+
+        self.log_x = log_x
+        x = np.log10(x) if log_x else x
+        self.curves = y.shape[:-1]
+        self.dtype = np.result_type(y, float)
+
+        # Monotonic runs share their end points; flat steps do not start a new run
+        step = np.sign(np.diff(x))
+        direction = step[np.flatnonzero(step)]
+        turns = np.flatnonzero(step)[1:][direction[1:] != direction[:-1]]
+        bounds = np.concatenate(([0], turns, [len(x) - 1]))
+
+        self.runs = []
+        self.segments = None
+        if len(bounds) - 1 > _MAX_RUNS:
+            dx = np.diff(x)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                slope = np.where(dx != 0, np.diff(y, axis=-1) / np.where(dx != 0, dx, 1), 0)
+            self.segments = (np.minimum(x[:-1], x[1:]), np.maximum(x[:-1], x[1:]), x, y, slope)
+        else:
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                xs, ys = x[start:stop + 1], y[..., start:stop + 1]
+                if xs[-1] < xs[0]:
+                    xs, ys = xs[::-1], ys[..., ::-1]
+                dx = np.diff(xs)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    slope = np.where(dx > 0, np.diff(ys, axis=-1) / np.where(dx > 0, dx, 1), 0)
+                self.runs.append((xs, ys, slope))
+
+        low, high = np.argmin(x), np.argmax(x)
+        self.x_min, self.x_max = x[low], x[high]
+        self.left = y[..., low] if left is None else left
+        self.right = y[..., high] if right is None else right
+        self.monotonic = len(bounds) == 2
+
+    def _first_segments(self, xq, result):
+        """Interpolate every query in the first segment, in array order, whose range contains it."""
+        lo, hi, x, y, slope = self.segments
+        chunk = max(1, _CHUNK_ELEMENTS // len(lo))
+        for first in range(0, len(xq), chunk):
+            q = xq[first:first + chunk]
+            inside = (q[:, None] >= lo) & (q[:, None] <= hi)
+            idx = np.argmax(inside, axis=1)
+            found = np.flatnonzero(inside[np.arange(len(q)), idx])
+            idx = idx[found]
+            result[..., first + found] = y[..., idx] + slope[..., idx] * (q[found] - x[idx])
+
+    def __call__(self, xq):
+        """
+        :param xq: Query values, any shape.
+        :return: Interpolated values of shape xq.shape, or (C,) + xq.shape for C curves.
+        """
+        xq = np.asarray(xq, dtype=float)
+        shape = xq.shape
+        xq = xq.reshape(-1)
+        if self.log_x:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                xq = np.log10(xq)
+
+        result = np.full(self.curves + xq.shape, np.nan, dtype=self.dtype)
+        if self.segments is not None:
+            self._first_segments(xq, result)
+        pending = np.ones(len(xq), dtype=bool)
+        for xs, ys, slope in self.runs:
+            inside = np.flatnonzero(pending & (xq >= xs[0]) & (xq <= xs[-1]))
+            if len(inside) == 0:
+                continue
+            q = xq[inside]
+            idx = np.clip(np.searchsorted(xs, q, side='right') - 1, 0, len(xs) - 2)
+            result[..., inside] = ys[..., idx] + slope[..., idx] * (q - xs[idx])
+            pending[inside] = False
+            if self.monotonic or not pending.any():
+                break
+
+        below, above = xq < self.x_min, xq > self.x_max
+        result[..., below] = np.asarray(self.left)[..., None]
+        result[..., above] = np.asarray(self.right)[..., None]
+        return result.reshape(self.curves + shape)[()]
+
+
+def interpolate(x, y, xq, log_x: bool = False, left=None, right=None):
+    """
+    One-shot Interpolator(x, y, log_x, left, right)(xq); build an Interpolator to reuse it across queries.
+    """
+    return Interpolator(x, y, log_x, left, right)(xq)
@@ -0,0 +1,269 @@
+import itertools
+import numpy as np
+from data_processing import evaluate_expressions
+from file_readers import ng_raw_iter
+
+
+class LookupTable:
+    """
+    Device characterization data (e.g. id, gm, gds, vdsat over L, VGS, VDS, VSB) on an N-dimensional grid,
+    for gm/id based sizing.
+
+    Parameters can be looked up by name or by an expression over parameters, axes and constants such as
+    'gm/id' or 'id/w'. Expressions are evaluated once on the grid and then interpolated multi-linearly,
+    for thousands of query points per call.
+
+    Example:
+    lut = LookupTable.from_raw('nfet_char.raw', axes={'vgs': 'v(g)', 'vds': 'v(d)'}, parameters={'id': 'i(vd)', ...},
+                               outer={'l': l_values}, constants={'w': 1e-6})
+    lut.save('nfet_01v8.npz')
+    lut = LookupTable.load('nfet_01v8.npz')
+    gm_id = lut.interpolate('gm/id', l=0.5e-6, vgs=np.linspace(0.3, 1.2, 1000), vds=0.9)
+    sizing = lut.solve(['vdsat', 'id/w'], 'gm/id', 15, l=0.5e-6, vds=0.9)
+    w = 10e-6 / sizing['id/w']  # Width carrying 10 uA at gm/id = 15 (W/L = w / 0.5e-6)
+    """
+
+    def __init__(self, axes, values, constants=None):
+        """
+        Parameters:
+        axes (dict): {axis name: increasing grid values}, in grid dimension order.
+        values (dict): {parameter name: array shaped like the grid}.
+        constants (dict): Scalars available to expressions, e.g. the characterized width.
+        """
+        self.axes = {name: np.asarray(grid, dtype=float).reshape(-1) for name, grid in axes.items()}
+        for name, grid in self.axes.items():
+            if np.any(np.diff(grid) <= 0):
+                raise ValueError(f"Axis {name} must be strictly increasing")
+        self.shape = tuple(len(grid) for grid in self.axes.values())
+        self.values = {name: np.asarray(value).reshape(self.shape) for name, value in values.items()}
+        self.constants = dict(constants or {})
+        self._derived = {}
+
+    @classmethod
+    def from_frame(cls, df, axes, parameters=None, constants=None, decimals=12):
+        """
+        Build a table from a long DataFrame with one row per characterization point.
+
+        The grid of each axis is the set of distinct values of its column, rounded to decimals to absorb
+        floating point noise of swept sources. Grid points without a row are NaN.
+
+        Parameters:
+        df (pd.DataFrame): Characterization data.
+        axes (list or dict): Axis columns, or {axis name: column}.
+        parameters (list or dict): Parameter columns, or {parameter name: column}; all other columns when None.
+        constants (dict): As in LookupTable.
+        decimals (int): Rounding applied to axis values before building the grid.
+
+        Returns:
+        LookupTable: The gridded data.
+        """
+        axes = axes if isinstance(axes, dict) else {name: name for name in axes}
+        if parameters is None:
+            parameters = [col for col in df.columns if col not in axes.values()]
+        parameters = parameters if isinstance(parameters, dict) else {name: name for name in parameters}
+
+        grids = {}
+        positions = []
+        for name, col in axes.items():
+            grids[name], inverse = np.unique(np.round(np.real(df[col].to_numpy()), decimals), return_inverse=True)
+            positions.append(inverse.reshape(-1))
+        shape = tuple(len(grid) for grid in grids.values())
+        flat = np.ravel_multi_index(positions, shape)
+
+        missing = np.prod(shape) - len(np.unique(flat))
+        if missing:
+            print(f"Warning: {missing} of {np.prod(shape)} grid points have no data and are set to NaN")
+
+        values = {}
+        for name, col in parameters.items():
+            grid = np.full(np.prod(shape), np.nan)
+            grid[flat] = np.real(df[col].to_numpy())
+            values[name] = grid.reshape(shape)
+        return cls(grids, values, constants)
+
+    @classmethod
+    def from_raw(cls, files, axes, parameters=None, outer=None, plotname='dc', constants=None, decimals=12):
+        """
+        Build a table from the DC sweeps of one or more raw files.
+
+        Inner sweep axes (e.g. VGS and VDS of a nested dc sweep) are read from columns of each plot. Axes
+        swept outside the simulator command (e.g. L changed with alterparam and written with
+        `set appendwrite`) are not in the data and are given through outer, one value per plot.
+
+        Parameters:
+        files (str or list[str]): Raw file paths, read in order.
+        axes, parameters: As in from_frame, naming columns of the plots (without duplicate suffixes).
+        outer (dict): {axis name: values}, one value per matching plot across all files.
+        plotname (str): simType alias or plotname of the plots to read.
+        constants, decimals: As in from_frame.
+
+        Returns:
+        LookupTable: The gridded data.
+        """
+        import pandas as pd
+
+        files = [files] if isinstance(files, str) else list(files)
+        axes = axes if isinstance(axes, dict) else {name: name for name in axes}
+        outer = outer or {}
+        columns = None
+        if parameters is not None:
+            parameters = parameters if isinstance(parameters, dict) else {name: name for name in parameters}
+            columns = [col for col in list(axes.values()) + list(parameters.values()) if col not in outer]
+
+        frames = []
+        for fname in files:
+            for arr, plot in ng_raw_iter(fname, plotname, columns=columns):
+                frames.append(pd.DataFrame(data=arr, columns=plot['varnames']).set_axis(plot['basenames'], axis=1))
+        if not frames:
+            raise ValueError(f"No {plotname} plots in {', '.join(files)}")
+
+        for name, values in outer.items():
+            if len(values) != len(frames):
+                raise ValueError(f"outer axis {name} has {len(values)} values for {len(frames)} plots")
+            for frame, value in zip(frames, values):
+                frame[name] = value
+        axes.update({name: name for name in outer})
+        return cls.from_frame(pd.concat(frames, ignore_index=True), axes, parameters, constants, decimals)
+
+    def save(self, fname, dtype=np.float32):
+        """Store the table as a compressed .npz file, with parameter values cast to dtype."""
+        np.savez_compressed(
+            fname,
+            axis_names=np.array(list(self.axes)),
+            parameter_names=np.array(list(self.values)),
+            constant_names=np.array(list(self.constants)),
+            constant_values=np.array(list(self.constants.values()), dtype=float),
+            values=np.stack([value.astype(dtype) for value in self.values.values()]) if self.values
+            else np.empty((0,) + self.shape, dtype=dtype),
+            **{f'axis{i}': grid for i, grid in enumerate(self.axes.values())})
+
+    @classmethod
+    def load(cls, fname):
+        """Load a table stored with save."""
+        with np.load(fname) as data:
+            axes = {str(name): data[f'axis{i}'] for i, name in enumerate(data['axis_names'])}
+            values = dict(zip(map(str, data['parameter_names']), data['values']))
+            constants = dict(zip(map(str, data['constant_names']), data['constant_values'].tolist()))
+        return cls(axes, values, constants)
+
+    def grid(self, name):
+        """Values of a parameter, axis or expression on the whole grid."""
+        if name in self.values:
+            return self.values[name]
+        if name not in self._derived:
+            variables = dict(self.values)
+            for dim, (axis, grid) in enumerate(self.axes.items()):
+                variables[axis] = grid.reshape([-1 if d == dim else 1 for d in range(len(self.shape))])
+            variables.update(self.constants)
+            results, _ = evaluate_expressions({name: name}, variables)
+            self._derived[name] = np.broadcast_to(results[name], self.shape)
+        return self._derived[name]
+
+    def _query_points(self, coords, extra=()):
+        unknown = set(coords) - set(self.axes)
+        if unknown:
+            raise ValueError(f"Unknown axes {', '.join(sorted(unknown))}, the table axes are {', '.join(self.axes)}")
+        missing = [name for name, grid in self.axes.items() if name not in coords and len(grid) > 1]
+        if missing:
+            raise ValueError(f"No value given for axes {', '.join(missing)}")
+
+        arrays = [np.asarray(coords.get(name, grid[0]), dtype=float) for name, grid in self.axes.items()]
+        shape = np.broadcast_shapes(*[np.shape(array) for array in arrays + list(extra)])
+        return [np.broadcast_to(array, shape).reshape(-1) for array in arrays], shape
+
+    def _interpolate(self, grids, points):
+        """Multi-linear interpolation of every grid at the query points (one flat array per axis)."""
+        count = len(points[0])
+        lower = []
+        frac = []
+        valid = np.ones(count, dtype=bool)
+        for grid, x in zip(self.axes.values(), points):
+            if len(grid) == 1:
+                lower.append(np.zeros(count, dtype=np.intp))
+                frac.append(np.zeros(count))
+                valid &= np.isclose(x, grid[0])
+                continue
+            idx = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, len(grid) - 2)
+            t = (x - grid[idx]) / (grid[idx + 1] - grid[idx])
+            valid &= (t >= -1e-9) & (t <= 1 + 1e-9)
+            lower.append(idx)
+            frac.append(t)
+
+        results = [np.zeros(count) for _ in grids]
+        steps = [(0, 1) if n > 1 else (0,) for n in self.shape]
+        for corner in itertools.product(*steps):
+            weight = np.ones(count)
+            for step, t in zip(corner, frac):
+                weight *= t if step else 1 - t
+            flat = np.ravel_multi_index([idx + step for idx, step in zip(lower, corner)], self.shape)
+            for result, grid in zip(results, grids):
+                result += weight * grid.reshape(-1)[flat]
+
+        for result in results:
+            result[~valid] = np.nan
+        return results
+
+    def interpolate(self, outputs, **coords):
+        """
+        Interpolate parameters or expressions at query points.
+
+        Parameters:
+        outputs (str or list[str]): Parameter names or expressions, e.g. 'vdsat' or ['gm/id', 'gm/gds'].
+        **coords: One value or array per axis, broadcast together. Axes with a single grid value can be
+        omitted. Points outside the grid give NaN.
+
+        Returns:
+        np.ndarray or dict: The interpolated values in the broadcast shape of the coordinates, or a dict
+        of them keyed by output when outputs is a list.
+        """
+        names = [outputs] if isinstance(outputs, str) else list(outputs)
+        points, shape = self._query_points(coords)
+        results = self._interpolate([self.grid(name) for name in names], points)
+        results = {name: result.reshape(shape) for name, result in zip(names, results)}
+        return results[outputs] if isinstance(outputs, str) else results
+
+    def solve(self, outputs, target, value, **coords):
+        """
+        Find where target equals value along the one axis left out of coords, and interpolate outputs there.
+
+        E.g. solve(['vdsat', 'id/w'], 'gm/id', 15, l=0.5e-6, vds=0.9, vsb=0) finds the VGS giving
+        gm/id = 15 and returns vdsat and id/w at that bias. The first crossing along the free axis is
+        used; queries without a crossing give NaN.
+
+        Parameters:
+        outputs (str or list[str]): Parameter names or expressions to report.
+        target (str): Parameter name or expression to solve for.
+        value (float or np.ndarray): Target value(s), broadcast with the coordinates.
+        **coords: Values of every axis but the free one.
+
+        Returns:
+        dict: The outputs and the free axis value, in the broadcast shape of value and coordinates.
+        """
+        free = [name for name, grid in self.axes.items() if name not in coords and len(grid) > 1]
+        if len(free) != 1:
+            raise ValueError(f"Exactly one axis must be left free to solve along, got {', '.join(free) or 'none'}")
+        free = free[0]
+        free_grid = self.axes[free]
+
+        points, shape = self._query_points({**coords, free: free_grid[0]}, extra=[value])
+        value = np.broadcast_to(np.asarray(value, dtype=float), shape).reshape(-1)
+        count, n = len(value), len(free_grid)
+
+        # Evaluate the target along the whole free axis for every query and find the first crossing
+        axis = list(self.axes).index(free)
+        sweep = [np.repeat(x, n) for x in points]
+        sweep[axis] = np.tile(free_grid, count)
+        curve = self._interpolate([self.grid(target)], sweep)[0].reshape(count, n) - value[:, None]
+        above = curve >= 0
+        cross = (above[:, :-1] != above[:, 1:]) & np.isfinite(curve[:, :-1]) & np.isfinite(curve[:, 1:])
+        idx = np.argmax(cross, axis=1)
+        rows = np.arange(count)
+        found = cross[rows, idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = curve[rows, idx] / (curve[rows, idx] - curve[rows, idx + 1])
+        points[axis] = np.where(found, free_grid[idx] + frac * (free_grid[idx + 1] - free_grid[idx]), np.nan)
+
+        names = [outputs] if isinstance(outputs, str) else list(outputs)
+        results = dict(zip(names, self._interpolate([self.grid(name) for name in names], points)))
+        results[free] = points[axis]
+        return {name: result.reshape(shape) for name, result in results.items()}
@@ -3,6 +3,44 @@ import matplotlib.pyplot as plt
 from typing import List, Optional, Tuple
 import math
 import matplotlib.ticker as ticker
+from interpolation import interpolate
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, bins: int,
+                    x_range: Optional[Tuple[float, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a trace to the minimum and maximum sample of each of bins consecutive index ranges.
+
+    Every peak and glitch stays in the output, which has at most about 2 * bins + 2 points. Only the
+    samples within x_range (plus one on each side, so lines run to the axis edges) are used.
+
+    :param x: Increasing x data.
+    :param y: Y data.
+    :param bins: Number of ranges, typically the pixel width of the axis.
+    :param x_range: Visible (xmin, xmax); the whole trace when None.
+    :return: Decimated (x, y).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    lo, hi = 0, len(x)
+    if x_range is not None:
+        lo = max(int(np.searchsorted(x, min(x_range), side='left')) - 1, 0)
+        hi = min(int(np.searchsorted(x, max(x_range), side='right')) + 1, len(x))
+    count = hi - lo
+    if count <= 4 * bins:
+        return x[lo:hi], y[lo:hi]
+
+    size = -(-count // bins)
+    full = count // size
+    block = y[lo:lo + full * size].reshape(full, size)
+    starts = lo + size * np.arange(full)
+    picks = [starts + block.argmin(axis=1), starts + block.argmax(axis=1), [lo, hi - 1]]
+    tail = lo + full * size
+    if tail < hi:
+        picks.append([tail + y[tail:hi].argmin(), tail + y[tail:hi].argmax()])
+    idx = np.unique(np.concatenate(picks))
+    return x[idx], y[idx]
+
 
 class PlotManager:
     """
@@ -25,6 +63,7 @@ class PlotManager:
         self.fig.suptitle(title)
         self._setup_axes(xlabel, ylabels, **kwargs)
         self.plots = [[] for _ in range(num_subplots)]
+        self._decimated = {}
 
     def _setup_axes(self, xlabel: str, ylabels: Optional[List[str]], **kwargs):
         """Set up the axes with proper labels and scales."""
@@ -65,23 +104,51 @@ class PlotManager:
         return f"{val*1e18:.2f}a"
 
     def plot(self, xaxis: np.ndarray, yaxis: np.ndarray, label: str, 
-             subplot_index: int = 0, linestyle: str = '-'):
+             subplot_index: int = 0, linestyle: str = '-', decimate: bool = True):
         """
         Add a plot to a specific subplot.
 
+        Long traces with increasing x are drawn min/max decimated to about the pixel width of the axis
+        (see minmax_decimate), and redrawn from the full data whenever the x limits change, e.g. on zoom.
+
         :param xaxis: X-axis data.
         :param yaxis: Y-axis data.
         :param label: Label for the plot.
         :param subplot_index: Index of the subplot to add the plot to.
         :param linestyle: Style of the line to plot.
+        :param decimate: Allow decimation of long traces.
         """
         if 0 <= subplot_index < self.num_subplots:
-            self.axs[subplot_index].plot(xaxis, yaxis, label=label, linestyle=linestyle)
-            self.axs[subplot_index].legend()
+            ax = self.axs[subplot_index]
+            bins = self._pixel_width(ax)
+            x = np.asarray(xaxis)
+            if decimate and len(x) > 4 * bins and np.all(x[1:] >= x[:-1]):
+                line, = ax.plot(*minmax_decimate(x, yaxis, bins), label=label, linestyle=linestyle)
+                if ax not in self._decimated:
+                    self._decimated[ax] = []
+                    ax.callbacks.connect('xlim_changed', self._redecimate)
+                self._decimated[ax].append((line, x, np.asarray(yaxis)))
+            else:
+                ax.plot(xaxis, yaxis, label=label, linestyle=linestyle)
+            ax.legend()
             self.plots[subplot_index].append((xaxis, yaxis, label))
         else:
             raise IndexError("subplot_index out of range")
 
+    @staticmethod
+    def _pixel_width(ax) -> int:
+        return max(int(ax.get_window_extent().width), 1)
+
+    def _redecimate(self, ax):
+        """Redraw the decimated traces of ax, and of the subplots sharing its x axis, for the current x limits."""
+        for other, traces in self._decimated.items():
+            if other is not ax and not ax.get_shared_x_axes().joined(ax, other):
+                continue
+            bins = self._pixel_width(other)
+            for line, x, y in traces:
+                line.set_data(*minmax_decimate(x, y, bins, other.get_xlim()))
+        self.fig.canvas.draw_idle()
+
     def add_line(self, line_orientation: str, line_value: float, line_label: str = '', 
                  line_color: str = 'red', subplot_index: int = 0):
         """
@@ -121,7 +188,8 @@ class PlotManager:
         if not (0 <= subplot_index < self.num_subplots):
             raise IndexError("subplot_index out of range")
 
-        lookup_result = self._lookup(lookup_array, lookup_value, lookup_return_array)
+        scale = self.axs[subplot_index].get_xscale() if cursor == 'v' else self.axs[subplot_index].get_yscale()
+        lookup_result = self._lookup(lookup_array, lookup_value, lookup_return_array, log_x=scale == 'log')
 
         if annotation_text is None:
             x_val, y_val = (lookup_value, lookup_result) if cursor == 'v' else (lookup_result, lookup_value)
@@ -134,10 +202,9 @@ class PlotManager:
                                          arrowprops=dict(arrowstyle="->", color=annotation_color))
 
     @staticmethod
-    def _lookup(array: np.ndarray, value: float, return_array: np.ndarray) -> float:
-        """Find the closest value in an array and return the corresponding value from another array."""
-        idx = (np.abs(array - value)).argmin()
-        return return_array[idx]
+    def _lookup(array: np.ndarray, value: float, return_array: np.ndarray, log_x: bool = False) -> float:
+        """Interpolate the value of return_array at value of array, on the line as drawn (log_x for log axes)."""
+        return interpolate(array, return_array, value, log_x=log_x)
 
     def show(self):
         """Display the plot."""
@@ -229,7 +296,7 @@ class PlotManager:
         ax.axvline(x=bw_3dB, color='red', linestyle='--', linewidth=1.5)
         
         # Find the phase at the 3dB frequency
-        phase_at_3db = np.interp(bw_3dB, frequency, phase_deg)
+        phase_at_3db = interpolate(frequency, phase_deg, bw_3dB, log_x=True)
         
         # Add horizontal cursor at the intersection
         ax.axhline(y=phase_at_3db, color='purple', linestyle=':', linewidth=1.5)
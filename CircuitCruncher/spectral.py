@@ -0,0 +1,195 @@
+import numpy as np
+
+# Half width, in FFT bins, of the band summed as one tone for each window
+_LEAKAGE_BINS = {'rect': 1, 'hann': 3, 'blackmanharris': 5}
+
+
+def _window(name, length):
+    if name == 'rect':
+        return np.ones(length)
+    if name == 'hann':
+        return np.hanning(length + 1)[:-1]
+    if name == 'blackmanharris':
+        phase = 2 * np.pi * np.arange(length) / length
+        return 0.35875 - 0.48829 * np.cos(phase) + 0.14128 * np.cos(2 * phase) - 0.01168 * np.cos(3 * phase)
+    raise ValueError(f"Unknown window '{name}', available windows: {', '.join(_LEAKAGE_BINS)}")
+
+
+def _uniform_chunk(t, columns, tu):
+    """Linearly interpolate every column at the increasing times tu, reading only the samples they span."""
+    idx = np.clip(np.searchsorted(t, tu, side='right') - 1, 0, len(t) - 2)
+    lo, hi = idx[0], idx[-1] + 2
+    tt = np.asarray(t[lo:hi], dtype=float)
+    local = idx - lo
+    dt = tt[local + 1] - tt[local]
+    frac = np.where(dt > 0, (tu - tt[local]) / np.where(dt > 0, dt, 1), 0.0)
+
+    out = np.empty((len(columns), len(tu)))
+    for row, column in enumerate(columns):
+        segment = np.real(np.asarray(column[lo:hi]))
+        out[row] = segment[local] + frac * (segment[local + 1] - segment[local])
+    return out
+
+
+def _time_span(t, t_start, t_stop, num_points):
+    t_start = float(t[0]) if t_start is None else t_start
+    t_stop = float(t[-1]) if t_stop is None else t_stop
+    if num_points is None:
+        count = np.searchsorted(t, t_stop, side='right') - np.searchsorted(t, t_start)
+        num_points = 1 << int(np.log2(max(count, 2)))
+    return t_start, t_stop, num_points
+
+
+def resample_uniform(t, y, num_points=None, t_start=None, t_stop=None, chunk_points=1 << 20):
+    """
+    Resample signals from ngspice's non-uniform timesteps onto a uniform grid by linear interpolation.
+
+    The grid has num_points samples spaced (t_stop - t_start) / num_points apart, so it ends one step
+    before t_stop as periodic FFT input expects. Output is built chunk_points samples at a time and only
+    the input samples a chunk spans are read, so memory mapped input (e.g. ng_raw_read(mmap=True)) is
+    never loaded as a whole.
+
+    Parameters:
+    t (np.ndarray): Increasing time points, shape (N,).
+    y (np.ndarray or list): Signals, shape (S, N) or (N,), or a list of S columns of length N.
+    num_points (int): Uniform samples; defaults to the largest power of two not above the number of
+        time points in [t_start, t_stop].
+    t_start, t_stop (float): Time window; defaults to the whole run.
+    chunk_points (int): Output samples computed per chunk.
+
+    Returns:
+    tuple: (tu, yu) with the uniform times, shape (num_points,), and signals, shape (S, num_points).
+    """
+    columns = [y] if np.ndim(y) == 1 and not isinstance(y, list) else list(y)
+    t_start, t_stop, num_points = _time_span(t, t_start, t_stop, num_points)
+    tu = t_start + (t_stop - t_start) / num_points * np.arange(num_points)
+
+    yu = np.empty((len(columns), num_points))
+    for first in range(0, num_points, chunk_points):
+        yu[:, first:first + chunk_points] = _uniform_chunk(t, columns, tu[first:first + chunk_points])
+    return tu, yu
+
+
+def power_spectrum(t, y, num_points=None, t_start=None, t_stop=None, window='blackmanharris', segment_points=None):
+    """
+    Windowed power spectra of many non-uniformly sampled signals at once.
+
+    The signals are resampled onto a uniform grid (see resample_uniform) and transformed together with
+    one batched FFT. With segment_points, the grid is cut into consecutive segments of that length whose
+    spectra are averaged (Welch), and each segment is resampled only when it is transformed, so runs of
+    any length are processed in bounded memory. Trailing samples beyond a whole number of segments are
+    dropped.
+
+    Parameters:
+    t, y, num_points, t_start, t_stop: As in resample_uniform.
+    window (str): 'blackmanharris', 'hann' or 'rect'.
+    segment_points (int): Samples per averaged segment, at most num_points; one segment of num_points
+        when None.
+
+    Returns:
+    tuple: (freqs, power) with the FFT bin frequencies, shape (F,), and power spectra, shape (S, F).
+    """
+    columns = [y] if np.ndim(y) == 1 and not isinstance(y, list) else list(y)
+    t_start, t_stop, num_points = _time_span(t, t_start, t_stop, num_points)
+    segment_points = segment_points or num_points
+    if segment_points > num_points:
+        raise ValueError(f"segment_points ({segment_points}) exceeds num_points ({num_points})")
+    step = (t_stop - t_start) / num_points
+    taper = _window(window, segment_points)
+
+    power = np.zeros((len(columns), segment_points // 2 + 1))
+    segments = num_points // segment_points
+    for segment in range(segments):
+        tu = t_start + step * (segment * segment_points + np.arange(segment_points))
+        power += np.abs(np.fft.rfft(_uniform_chunk(t, columns, tu) * taper, axis=1)) ** 2
+    return np.fft.rfftfreq(segment_points, step), power / segments
+
+
+def spectral_metrics(freqs, power, fundamental=None, harmonics=5, window='blackmanharris', leakage_bins=None):
+    """
+    THD, SNR, SNDR, SFDR and ENOB of many power spectra at once.
+
+    Each tone is the power within leakage_bins of its bin (the window's main lobe). The fundamental is the
+    largest tone above DC unless given, and harmonics 2 to harmonics are located from the fundamental's
+    power-weighted frequency, folded back into the first Nyquist zone. Noise is everything but DC, the
+    fundamental and the harmonics.
+
+    Parameters:
+    freqs (np.ndarray): Bin frequencies from power_spectrum, shape (F,).
+    power (np.ndarray): Power spectra, shape (S, F) or (F,).
+    fundamental (float or np.ndarray): Fundamental frequency, scalar or one per signal.
+    harmonics (int): Highest harmonic counted as distortion.
+    window (str): Window the spectra were computed with, selecting the default leakage_bins.
+    leakage_bins (int): Half width of a tone in bins.
+
+    Returns:
+    dict: Arrays of shape (S,) for fundamental (Hz), THD, SNR, SNDR, SFDR (dB) and ENOB (bits).
+    """
+    power = np.atleast_2d(power)
+    span = _LEAKAGE_BINS[window] if leakage_bins is None else leakage_bins
+    rows = np.arange(power.shape[0])
+    bins = np.arange(power.shape[1])
+    fft_points = 2 * (power.shape[1] - 1)
+    dc = bins <= span
+
+    def tone(center):
+        return (np.abs(bins[None, :] - np.asarray(center)[:, None]) <= span) & ~dc
+
+    if fundamental is None:
+        peak = np.argmax(np.where(dc, -np.inf, power), axis=1)
+    else:
+        guess = np.broadcast_to(np.rint(np.asarray(fundamental) / freqs[1]).astype(int), rows.shape)
+        peak = np.argmax(np.where(tone(guess), power, -np.inf), axis=1)
+    fund = tone(peak)
+    p_fund = np.sum(power, axis=1, where=fund)
+    center = np.sum(power * bins, axis=1, where=fund) / p_fund
+
+    harm = np.zeros_like(fund)
+    for k in range(2, harmonics + 1):
+        folded = np.rint(k * center).astype(int) % fft_points
+        folded = np.where(folded > fft_points // 2, fft_points - folded, folded)
+        harm |= tone(folded) & ~fund
+    p_harm = np.sum(power, axis=1, where=harm)
+    p_noise = np.sum(power, axis=1, where=~(dc | fund | harm))
+    spur = np.max(np.where(dc | fund, 0, power), axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        SNDR = 10 * np.log10(p_fund / (p_noise + p_harm))
+        return {
+            "fundamental": center * freqs[1],
+            "THD": 10 * np.log10(p_harm / p_fund),
+            "SNR": 10 * np.log10(p_fund / p_noise),
+            "SNDR": SNDR,
+            "SFDR": 10 * np.log10(power[rows, peak] / spur),
+            "ENOB": (SNDR - 1.76) / 6.02,
+        }
+
+
+def spectral_analysis(df, signals=None, time='time', num_points=None, t_start=None, t_stop=None,
+                      fundamental=None, harmonics=5, window='blackmanharris', segment_points=None):
+    """
+    Spectral linearity metrics for many signals of a transient plot.
+
+    Columns are read through views of the DataFrame, so plots from to_data_frames(ng_raw_read(fname,
+    mmap=True), copy=False) are streamed from disk segment by segment.
+
+    Parameters:
+    df (pd.DataFrame): Transient plot as returned by to_data_frames.
+    signals (list[str]): Columns to analyse; all but time when None.
+    time (str): Name of the time column.
+    num_points, t_start, t_stop, window, segment_points: As in power_spectrum. For coherent sampling pick
+        t_start/t_stop spanning an integer number of periods.
+    fundamental, harmonics: As in spectral_metrics.
+
+    Returns:
+    pd.DataFrame: One row per signal with columns fundamental, THD, SNR, SNDR, SFDR and ENOB.
+    """
+    import pandas as pd
+
+    names = [col for col in df.columns if col != time] if signals is None else list(signals)
+    t = df[time].to_numpy()
+    t = t.real if np.iscomplexobj(t) else t
+    freqs, power = power_spectrum(t, [df[name].to_numpy() for name in names], num_points, t_start, t_stop,
+                                  window, segment_points)
+    metrics = spectral_metrics(freqs, power, fundamental, harmonics, window)
+    return pd.DataFrame(metrics, index=pd.Index(names, name='signal'))
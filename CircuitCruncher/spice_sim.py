@@ -1,14 +1,78 @@
 import os
 import datetime
+import glob
+import hashlib
+import itertools
+import json
 import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from disk_cache import evict_cache
+
+_FILE_DIGESTS = {}
+
+
+def simCacheDir():
+    """Directory of the simulation result cache, $CIRCUITCRUNCHER_SIM_CACHE_DIR or ~/.cache/CircuitCruncher/sim."""
+    return os.environ.get('CIRCUITCRUNCHER_SIM_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'CircuitCruncher', 'sim'))
+
+
+def _fileDigest(path):
+    """Return (sha256 of the file, files it includes), memoized on the file's size and modification time."""
+    stat = os.stat(path)
+    stamp = (path, stat.st_size, stat.st_mtime_ns)
+    if stamp not in _FILE_DIGESTS:
+        with open(path, 'rb') as file:
+            content = file.read()
+        includes = []
+        for match in re.finditer(rb'^[ \t]*\.(?:include|inc|lib)[ \t]+("[^"\n]*"|\'[^\'\n]*\'|\S+)([ \t]+\S+)?', content,
+                                 re.IGNORECASE | re.MULTILINE):
+            if match.group(0).lstrip().lower().startswith(b'.lib') and match.group(2) is None:
+                continue  # '.lib <section>' opens a library section, it does not name a file
+            include = os.path.expanduser(match.group(1).strip(b'"\'').decode(errors='replace'))
+            includes.append(os.path.normpath(os.path.join(os.path.dirname(path), include)))
+        _FILE_DIGESTS[stamp] = (hashlib.sha256(content).hexdigest(), includes)
+    return _FILE_DIGESTS[stamp]
+
+
+def netlistDigest(netlist, options=''):
+    """
+    Content hash of a netlist, every file it pulls in through .include/.lib (followed recursively,
+    relative paths resolved against the including file) and the ngspice options.
+    """
+    digest = hashlib.sha256(options.encode())
+    pending = [os.path.abspath(netlist)]
+    seen = set()
+    while pending:
+        path = pending.pop(0)
+        if path in seen:
+            continue
+        seen.add(path)
+        if not os.path.isfile(path):
+            digest.update(f"missing {path}".encode())
+            continue
+        content_digest, includes = _fileDigest(path)
+        digest.update(content_digest.encode())
+        pending.extend(includes)
+    return digest.hexdigest()
+
 
 class SpiceSimulator:
-    def __init__(self, name, simdir, config, runsim=True):
+    def __init__(self, name, simdir, config, runsim=True, cache=False, cache_dir=None, max_cache_bytes=2 * 1024 ** 3):
         self.name = name
         self.simdir = simdir
         self.config = config
         self.runsim = runsim
         self.err = None
+        # Result cache: reruns of an unchanged netlist/includes/options restore the previous raw and log files
+        self.cache = cache
+        self.cache_dir = cache_dir or simCacheDir()
+        self.max_cache_bytes = max_cache_bytes
 
     def comment(self, message):
         print(message)
@@ -22,46 +86,42 @@ class SpiceSimulator:
         except OSError as e:
             self.comment(f"Error: {filename} : {e.strerror}")
 
+    def cacheKey(self, netlist, command):
+        return netlistDigest(netlist, f"{self.name}|{command}")
+
+    def restoreCache(self, key, outdir):
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry, 'outputs.json')) as manifest:
+                files = json.load(manifest)['files']
+            for name in files:
+                shutil.copy2(os.path.join(entry, name), os.path.join(outdir, name))
+        except (OSError, ValueError, KeyError):
+            return False
+        os.utime(entry)  # Mark as recently used for eviction
+        return True
+
+    def storeCache(self, key, files):
+        entry = os.path.join(self.cache_dir, key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.', dir=self.cache_dir)
+        for path in files:
+            shutil.copy2(path, staging)
+        with open(os.path.join(staging, 'outputs.json'), 'w') as manifest:
+            json.dump({'files': [os.path.basename(path) for path in files]}, manifest)
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)  # Another run cached the same simulation first
+        evict_cache(self.cache_dir, self.max_cache_bytes, keep=entry)
+
     def includeSaveSpice(self, savedir, input_file='save.spi'):
         spice_file = os.path.join(self.simdir, self.name + ".spice")
         with open(spice_file, 'r') as file:
             lines = file.readlines()
 
-        control_start = None
-        save_all_line = None
-        control_end = None
-
-        for i, line in enumerate(lines):
-            stripped_line = line.strip()
-            if stripped_line == '.control':
-                control_start = i
-            elif stripped_line.startswith('save all'):
-                save_all_line = i
-            elif stripped_line == '.endc':
-                control_end = i
-                break
-
-        if control_start is None or control_end is None:
-            raise ValueError("The netlist file does not contain a proper .control/.endc block.")
-
-        # Delete all .include statements within the .control block first for multiple runs 
-        i = control_start + 1
-        while i < control_end:
-            if lines[i].strip().startswith('.include'):
-                del lines[i]
-                control_end -= 1
-            else:
-                i += 1
-
-        if save_all_line is not None:
-            insert_position = save_all_line + 1
-        else:
-            insert_position = control_start + 1
-
-        include_path = os.path.join(savedir, input_file)
-        include_command = f"    .include {include_path}\n"
-
-        lines.insert(insert_position, include_command)
+        lines = insertInclude(lines, os.path.join(savedir, input_file))
 
         with open(spice_file, 'w') as file:
             file.writelines(lines)
@@ -69,6 +129,9 @@ class SpiceSimulator:
 
     def ngspice(self, ignore=True):
         simOk = True
+        key = None
+        restored = False
+        log_file_path = os.path.join(self.simdir, self.name + ".log")
 
         if self.runsim:
             tickTime = datetime.datetime.now()
@@ -88,22 +151,29 @@ class SpiceSimulator:
             os.system(rawcmd)
             # self.removeFile(self.oname + ".yaml")
 
+            if self.cache:
+                key = self.cacheKey(os.path.join(self.simdir, self.name + ".spice"), f"ngspice {options} {includes}")
+                restored = self.restoreCache(key, self.simdir)
 
-            log_file_path = os.path.join(self.simdir, self.name + ".log")
-            # Run NGSPICE
-            cmd = f"cd {self.simdir}; ngspice {options} {includes} {self.name}.spice 2>&1 |tee {self.name}.log"
-            self.comment(cmd)
-            try:
-                self.err = os.system(cmd)
-            except Exception as e:
-                print(e)
+            if restored:
+                self.comment(f"Restored cached results of {self.name}")
+                self.err = 0
+            else:
+                before = self._rawStamps(self.simdir)
+                # Run NGSPICE
+                cmd = f"cd {self.simdir}; ngspice {options} {includes} {self.name}.spice 2>&1 |tee {self.name}.log"
+                self.comment(cmd)
+                try:
+                    self.err = os.system(cmd)
+                except Exception as e:
+                    print(e)
 
-            # Exit directly if Ctrl-C is pressed
-            if self.err == 2:
-                exit()
+                # Exit directly if Ctrl-C is pressed
+                if self.err == 2:
+                    exit()
 
-            if self.err > 0:
-                simOk = False
+                if self.err > 0:
+                    simOk = False
 
             nextTime = datetime.datetime.now()
             self.comment("Corner simulation time : " + str(nextTime - tickTime))
@@ -127,4 +197,216 @@ class SpiceSimulator:
         else:
             self.comment(f"Log file {log_file_path} not found.")
 
-        return simOk if not ignore else True
\ No newline at end of file
+        # Only successful runs are cached, with the raw files this run wrote
+        if key is not None and not restored and simOk and os.path.exists(log_file_path):
+            after = self._rawStamps(self.simdir)
+            self.storeCache(key, [log_file_path] + [path for path, stamp in after.items() if before.get(path) != stamp])
+
+        return simOk if not ignore else True
+
+    @staticmethod
+    def _rawStamps(directory):
+        stamps = {}
+        for path in glob.glob(os.path.join(directory, "*.raw")):
+            stat = os.stat(path)
+            stamps[path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return stamps
+
+
+def insertInclude(lines, include_path):
+    control_start = None
+    save_all_line = None
+    control_end = None
+
+    for i, line in enumerate(lines):
+        stripped_line = line.strip()
+        if stripped_line == '.control':
+            control_start = i
+        elif stripped_line.startswith('save all'):
+            save_all_line = i
+        elif stripped_line == '.endc':
+            control_end = i
+            break
+
+    if control_start is None or control_end is None:
+        raise ValueError("The netlist file does not contain a proper .control/.endc block.")
+
+    lines = list(lines)
+    # Delete all .include statements within the .control block first for multiple runs 
+    i = control_start + 1
+    while i < control_end:
+        if lines[i].strip().startswith('.include'):
+            del lines[i]
+            control_end -= 1
+        else:
+            i += 1
+
+    if save_all_line is not None:
+        insert_position = save_all_line + 1
+    else:
+        insert_position = control_start + 1
+
+    include_command = f"    .include {include_path}\n"
+
+    lines.insert(insert_position, include_command)
+    return lines
+
+
+def cornerMatrix(corners):
+    """
+    Expand corners into a list of jobs, one dict of {parameter: value} per simulation.
+
+    corners is either a dict of {parameter: list of values}, expanded to every combination
+    (e.g. {'lib': ['tt', 'ss', 'ff'], 'temp': [-40, 27, 125]} gives 9 jobs), or an explicit list of dicts.
+    """
+    if isinstance(corners, dict):
+        names = list(corners)
+        return [dict(zip(names, values)) for values in itertools.product(*(corners[name] for name in names))]
+    return [dict(job) for job in corners]
+
+
+def applyCorner(lines, params, simdir):
+    """
+    Return a copy of netlist lines set up for one job.
+
+    Relative .include/.lib paths are resolved against simdir so the copy can run from any directory,
+    keeping their quotes. 'lib' selects the section of every .lib statement, 'rndseed' sets the ngspice
+    random seed for Monte Carlo runs with `.option seed`, which is read with the netlist, before any
+    agauss/gauss .param is evaluated, and every other parameter overrides (or adds) a .param definition.
+    """
+    params = dict(params)
+    lib = params.pop('lib', None)
+    rndseed = params.pop('rndseed', None)
+
+    out = []
+    for line in lines:
+        words = line.split()
+        keyword = words[0].lower() if words else ''
+        if keyword in ('.include', '.inc', '.lib') and len(words) > 1:
+            prefix, token, rest = re.match(r"(\s*\S+\s+)(\"[^\"]*\"|'[^']*'|\S+)(.*)", line, re.S).groups()
+            if keyword == '.lib' and not rest.strip():
+                out.append(line)  # '.lib <section>' opens a library section, it does not name a file
+                continue
+            quote = token[0] if token[0] in '"\'' else ''
+            path = token.strip('"\'')
+            if not os.path.isabs(path):
+                path = os.path.join(os.path.abspath(simdir), path)
+            if ' ' in path and not quote:
+                quote = '"'
+            if keyword == '.lib' and lib is not None and rest.strip():
+                rest = re.sub(r"^(\s+)\S+", lambda match: match.group(1) + str(lib), rest, count=1)
+            line = prefix + quote + path + quote + rest
+        elif keyword == '.param':
+            def override(match):
+                if match.group(1) not in params:
+                    return match.group(0)
+                return f"{match.group(1)}={params.pop(match.group(1))}"
+            line = re.sub(r"(\w+)\s*=\s*('[^']*'|\{[^}]*\}|\S+)", override, line)
+        elif keyword in ('.option', '.options') and rndseed is not None:
+            line, count = re.subn(r"(?i)\bseed\s*=\s*\S+", f"seed={rndseed}", line)
+            if count:
+                rndseed = None
+        out.append(line)
+
+    # Parameters the netlist does not define yet go in front of the .control block (or .end)
+    anchor = next((i for i, line in enumerate(out) if line.strip().lower() in ('.control', '.end')), len(out))
+    out[anchor:anchor] = [f".param {name}={value}\n" for name, value in params.items()]
+    if rndseed is not None:
+        out.insert(anchor, f".option seed={rndseed}\n")
+    return out
+
+
+class SpiceRunner(SpiceSimulator):
+    """
+    Run the simulation of a SpiceSimulator netlist over many corners / Monte Carlo seeds in parallel.
+
+    Every job gets its own copy of the netlist in workdir/<name>_<job number>, so jobs never share files,
+    and ngspice is launched there through subprocess on a pool of max_workers threads (default: one per
+    CPU). The ngspice command defaults to "ngspice" and can be set with config["ngspice"]["executable"],
+    e.g. to a stand-in script for testing. With cache=True, jobs whose netlist copy is unchanged restore
+    their raw and log files from the result cache instead of running.
+    """
+
+    def __init__(self, name, simdir, config, runsim=True, workdir=None, max_workers=None, timeout=None,
+                 cache=False, cache_dir=None, max_cache_bytes=2 * 1024 ** 3):
+        super().__init__(name, simdir, config, runsim, cache, cache_dir, max_cache_bytes)
+        self.workdir = workdir or os.path.join(simdir, name + "_runs")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+
+    def command(self):
+        ngspice_config = self.config.get("ngspice", {})
+        executable = ngspice_config.get("executable", "ngspice")
+        return shlex.split(executable) + shlex.split(ngspice_config.get("options", ""))
+
+    def prepareJob(self, index, params, savedir=None, input_file='save.spi'):
+        with open(os.path.join(self.simdir, self.name + ".spice"), 'r') as file:
+            lines = file.readlines()
+
+        lines = applyCorner(lines, params, self.simdir)
+        if savedir is not None:
+            lines = insertInclude(lines, os.path.join(os.path.abspath(os.path.join(self.simdir, savedir)), input_file))
+
+        jobdir = os.path.join(self.workdir, f"{self.name}_{index:04d}")
+        shutil.rmtree(jobdir, ignore_errors=True)
+        os.makedirs(jobdir)
+        netlist = os.path.join(jobdir, self.name + ".spice")
+        with open(netlist, 'w') as file:
+            file.writelines(lines)
+
+        return {'index': index, 'params': dict(params), 'workdir': jobdir, 'netlist': netlist,
+                'log': os.path.join(jobdir, self.name + ".log"), 'raw': [], 'status': 'pending',
+                'returncode': None, 'errors': [], 'time': 0.0}
+
+    def runJob(self, job):
+        tick = time.perf_counter()
+        key = self.cacheKey(job['netlist'], ' '.join(self.command())) if self.cache else None
+        if key is not None and self.restoreCache(key, job['workdir']):
+            job['status'] = 'ok'
+            job['returncode'] = 0
+            job['raw'] = sorted(glob.glob(os.path.join(job['workdir'], "*.raw")))
+            job['time'] = time.perf_counter() - tick
+            return job
+
+        try:
+            with open(job['log'], 'w') as log:
+                job['returncode'] = subprocess.run(self.command() + [os.path.basename(job['netlist'])],
+                                                   cwd=job['workdir'], stdout=log, stderr=subprocess.STDOUT,
+                                                   stdin=subprocess.DEVNULL, timeout=self.timeout).returncode
+        except subprocess.TimeoutExpired:
+            job['status'] = 'timeout'
+        except OSError as e:
+            job['status'] = 'error'
+            job['errors'] = [str(e)]
+        job['time'] = time.perf_counter() - tick
+
+        if job['status'] == 'pending':
+            with open(job['log'], errors='replace') as fi:
+                job['errors'] = [l.strip() for l in fi if re.search("(Error|ERROR):", l) and not re.search("no graphics interface", l)]
+            job['status'] = 'ok' if job['returncode'] == 0 and not job['errors'] else 'failed'
+        job['raw'] = sorted(glob.glob(os.path.join(job['workdir'], "*.raw")))
+        if key is not None and job['status'] == 'ok':
+            self.storeCache(key, [job['log']] + job['raw'])
+        return job
+
+    def run(self, corners, savedir=None, input_file='save.spi'):
+        """
+        Simulate every job of cornerMatrix(corners) and return one dict per job, in job order, with its
+        params, workdir, netlist, log and raw file paths, status ('ok', 'failed', 'timeout' or 'error'),
+        returncode, error lines from the log and run time. With savedir, input_file is included in every
+        job's netlist as includeSaveSpice would, without touching the original netlist.
+        """
+        jobs = [self.prepareJob(index, params, savedir, input_file) for index, params in enumerate(cornerMatrix(corners))]
+        if not self.runsim:
+            self.warning(f"Info: Skipping simulation of {len(jobs)} jobs of {self.name}.spice")
+            return jobs
+
+        tickTime = datetime.datetime.now()
+        self.comment(f"Running {len(jobs)} jobs of {self.name} on {self.max_workers} workers")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for job in pool.map(self.runJob, jobs):
+                if job['status'] != 'ok':
+                    self.warning(f"{self.name} job {job['index']} {job['params']} {job['status']}, see {job['log']}")
+
+        self.comment("Corner simulation time : " + str(datetime.datetime.now() - tickTime))
+        return jobs
@@ -0,0 +1,127 @@
+import numpy as np
+from crossings import all_crossings, pad_crossings
+
+
+def _signal_matrix(df, signals=None, time='time'):
+    """Return (t, y, names) with y of shape (signals, points) from a transient DataFrame."""
+    names = [col for col in df.columns if col != time] if signals is None else list(signals)
+    t = np.real(df[time].to_numpy()).astype(float)
+    y = np.empty((len(names), len(t)))
+    for row, name in enumerate(names):
+        y[row] = np.real(df[name].to_numpy())
+    return t, y, names
+
+
+def crossing_times(t, y, level, edge='both'):
+    """
+    Times at which every signal crosses level, linearly interpolated between the (non-uniform) time points.
+
+    Parameters:
+    t (np.ndarray): Time points, shape (N,).
+    y (np.ndarray): Signals, shape (S, N) or (N,).
+    level (float or np.ndarray): Crossing level, scalar or one per signal.
+    edge (str): 'rise', 'fall' or 'both', like RISE/FALL/CROSS of ngspice's .meas.
+
+    Returns:
+    tuple: (times, counts) where times has shape (S, K), one row per signal holding its crossings in
+    time order, NaN padded to the largest crossing count K, and counts holds the crossings per signal.
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.atleast_2d(y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rows, idx, frac, counts = all_crossings(y, level, edge)
+    times = t[idx] + frac * (t[idx + 1] - t[idx])
+    return pad_crossings(times, rows, counts), counts
+
+
+def _first_after(times, after):
+    """First time of every row of times at or after the per-row time after, NaN if none."""
+    later = np.where(times >= after[:, None], times, np.inf)
+    first = np.min(later, axis=1, initial=np.inf)
+    return np.where(np.isinf(first), np.nan, first)
+
+
+def measure_transient(df, signals=None, time='time', start=None, initial=None, final=None,
+                      low=0.1, high=0.9, tolerance=0.02):
+    """
+    Step response measurements for many signals of a transient plot at once.
+
+    Every signal is measured against its step from initial to final (by default its values at start and
+    at the end of the run). All crossing times are interpolated between time points, so ngspice's
+    non-uniform timesteps need no resampling.
+
+    Parameters:
+    df (pd.DataFrame): Transient plot as returned by to_data_frames.
+    signals (list[str]): Columns to measure; all but time when None.
+    time (str): Name of the time column.
+    start (float): Time of the input step; data before it is ignored. Defaults to the first time point.
+    initial, final (float or np.ndarray): Step levels, scalar or one per signal, e.g. the logic levels of
+        a pulse whose end value equals its start value.
+    low, high (float): Reference levels for rise/fall time and slew rate, as fractions of the step.
+    tolerance (float): Settling band around final, as a fraction of the step.
+
+    Returns:
+    pd.DataFrame: One row per signal with columns initial, final, delay (to 50% of the step in its
+    direction), rise_time, fall_time (first low->high rising and high->low falling edges), slew_rise,
+    slew_fall (V/s between the reference levels), overshoot (% of the step past final) and settling_time
+    (until the signal last enters the tolerance band). Times are relative to start; measurements that
+    do not occur are NaN.
+    """
+    import pandas as pd
+
+    t, y, names = _signal_matrix(df, signals, time)
+    if start is not None:
+        first = np.searchsorted(t, start)
+        t, y = t[first:], y[:, first:]
+    start = t[0]
+
+    initial = np.broadcast_to(y[:, 0] if initial is None else np.asarray(initial, dtype=float), (len(names),))
+    final = np.broadcast_to(y[:, -1] if final is None else np.asarray(final, dtype=float), (len(names),))
+    step = final - initial
+    swing = np.abs(step)
+    bottom = np.minimum(initial, final)
+    level_low = bottom + low * swing
+    level_high = bottom + high * swing
+
+    starts = np.full(len(names), start)
+    rise_low = _first_after(crossing_times(t, y, level_low, 'rise')[0], starts)
+    rise_high = _first_after(crossing_times(t, y, level_high, 'rise')[0], rise_low)
+    fall_high = _first_after(crossing_times(t, y, level_high, 'fall')[0], starts)
+    fall_low = _first_after(crossing_times(t, y, level_low, 'fall')[0], fall_high)
+    rise_time = rise_high - rise_low
+    fall_time = fall_low - fall_high
+
+    mid = bottom + 0.5 * swing
+    delay = np.where(step >= 0, _first_after(crossing_times(t, y, mid, 'rise')[0], starts),
+                     _first_after(crossing_times(t, y, mid, 'fall')[0], starts)) - start
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slew_rise = (level_high - level_low) / rise_time
+        slew_fall = (level_high - level_low) / fall_time
+        overshoot = np.where(step >= 0, y.max(axis=1) - final, final - y.min(axis=1)) / swing * 100
+    overshoot = np.where(swing > 0, np.maximum(overshoot, 0), np.nan)
+
+    # Settling: the exit from the tolerance band after the last sample outside it
+    error = np.abs(y - final[:, None])
+    band = tolerance * swing
+    outside = error > band[:, None]
+    last = y.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1)
+    rows = np.arange(len(names))
+    nxt = np.minimum(last + 1, y.shape[1] - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.clip((error[rows, last] - band) / (error[rows, last] - error[rows, nxt]), 0, 1)
+    settled_at = t[last] + frac * (t[nxt] - t[last])
+    settling_time = np.where(~outside.any(axis=1), 0.0, np.where(last == y.shape[1] - 1, np.nan, settled_at - start))
+    settling_time = np.where(swing > 0, settling_time, np.nan)
+
+    return pd.DataFrame({
+        'initial': initial,
+        'final': final,
+        'delay': delay,
+        'rise_time': rise_time,
+        'fall_time': fall_time,
+        'slew_rise': slew_rise,
+        'slew_fall': slew_fall,
+        'overshoot': overshoot,
+        'settling_time': settling_time,
+    }, index=pd.Index(names, name='signal'))
@@ -0,0 +1,41 @@
+import CircuitCruncher as cc
+import numpy as np
+import os
+import subprocess
+import sys
+import tempfile
+
+# Change this to where you downloaded the repo
+# Enable this if: t you didn't Setup repo on device using python3 -m pip install --user -e
+# sys.path.append('/home/tare/Repos/CircuitCruncher/CircuitCruncher')
+
+# Times `import CircuitCruncher` and a first ng_raw_read in fresh interpreters, and lists which heavy
+# dependencies each step ends up importing
+num_runs = 5
+heavy_modules = ['numpy', 'pandas', 'matplotlib', 'prettytable', 'yaml']
+
+child = '''
+import sys, time
+tick = time.perf_counter()
+import CircuitCruncher as cc
+imported = time.perf_counter()
+if len(sys.argv) > 1:
+    cc.ng_raw_read(sys.argv[1])
+read = time.perf_counter()
+print(imported - tick, read - imported, ','.join(m for m in {heavy} if m in sys.modules))
+'''.format(heavy=heavy_modules)
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    fname = os.path.join(tmpdir, 'bench.raw')
+    data = np.zeros(1000, dtype=[('time', np.float64), ('v(out)', np.float64)])
+    data['time'] = np.linspace(0, 1e-6, len(data))
+    cc.ng_raw_write(fname, data)
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    for label, args in (('import CircuitCruncher', []), ('+ ng_raw_read', [fname])):
+        runs = [subprocess.run([sys.executable, '-c', child] + args, env=env, capture_output=True,
+                               text=True, check=True).stdout.split() for _ in range(num_runs)]
+        import_time = min(float(run[0]) for run in runs)
+        read_time = min(float(run[1]) for run in runs)
+        loaded = runs[0][2] if len(runs[0]) > 2 else '-'
+        print(f"{label:>22}: import {import_time * 1e3:7.1f} ms, read {read_time * 1e3:7.1f} ms, loaded: {loaded}")
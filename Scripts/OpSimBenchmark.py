@@ -0,0 +1,37 @@
+import CircuitCruncher as cc
+import contextlib
+import io
+import numpy as np
+import os
+import pandas as pd
+import sys
+import tempfile
+import time
+
+# Change this to where you downloaded the repo
+# Enable this if: t you didn't Setup repo on device using python3 -m pip install --user -e
+# sys.path.append('/home/tare/Repos/CircuitCruncher/CircuitCruncher')
+
+# Times op_matrix (compute only) and op_sim (compute + table rendering) on synthetic OP data
+device_counts = [100, 1000, 10000]
+op_vars = ['vgs', 'vds', 'vdsat', 'gm', 'gmbs', 'id', 'vth', 'gds', 'cgs', 'cgb', 'cgd']
+additional_vars = ['cgs', 'gmbs', 'vgs', 'cgb', 'cgd']
+custom_expressions = {"Avi": "gm*ro", "Cgg": "cgb+cgs+cgd"}
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    for num_devices in device_counts:
+        columns = [f'@m.x1.xm{i}.msky130_fd_pr__nfet_01v8[{var}]' for i in range(num_devices) for var in op_vars]
+        df = pd.DataFrame(np.random.rand(1, len(columns)), columns=columns)
+
+        tick = time.perf_counter()
+        cc.op_matrix(df, additional_vars=additional_vars, custom_expressions=custom_expressions)
+        matrix_time = time.perf_counter() - tick
+
+        tick = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cc.op_sim(df, output_file=os.path.join(tmpdir, 'op'), html=False,
+                      additional_vars=additional_vars, custom_expressions=custom_expressions)
+        table_time = time.perf_counter() - tick
+
+        print(f"{num_devices:>6} devices ({len(columns):>6} columns): op_matrix {matrix_time * 1e3:8.1f} ms, "
+              f"op_sim {table_time * 1e3:8.1f} ms")
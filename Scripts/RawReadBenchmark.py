@@ -0,0 +1,44 @@
+import CircuitCruncher as cc
+import numpy as np
+import pandas as pd
+import os
+import sys
+import tempfile
+import time
+
+# Change this to where you downloaded the repo
+# Enable this if: t you didn't Setup repo on device using python3 -m pip install --user -e
+# sys.path.append('/home/tare/Repos/CircuitCruncher/CircuitCruncher')
+
+# Compares ng_raw_read throughput on the same transient data written as binary and as ASCII raw files
+num_points = 200000
+num_vars = 20
+
+
+def write_ascii_raw(fname, df):
+    header = ['Title: benchmark', 'Date: today', 'Plotname: Transient Analysis', 'Flags: real',
+              f'No. Variables: {df.shape[1]}', f'No. Points: {df.shape[0]}', 'Variables:']
+    header += [f'\t{i}\t{name}\t{"time" if i == 0 else "voltage"}' for i, name in enumerate(df.columns)]
+    lines = [f' {i}' + ''.join(f'\t{value:.15e}\n' for value in row) for i, row in enumerate(df.to_numpy())]
+    with open(fname, 'wb') as f:
+        f.write(('\n'.join(header + ['Values:']) + '\n').encode())
+        f.write(''.join(lines).encode())
+
+
+data = pd.DataFrame(np.random.rand(num_points, num_vars),
+                    columns=['time'] + [f'v(n{i})' for i in range(1, num_vars)])
+with tempfile.TemporaryDirectory() as tmpdir:
+    for ascii in (False, True):
+        fname = os.path.join(tmpdir, 'ascii.raw' if ascii else 'binary.raw')
+        if ascii:
+            write_ascii_raw(fname, data)
+        else:
+            cc.ng_raw_write(fname, data)
+        size_mb = os.path.getsize(fname) / 1e6
+
+        tick = time.perf_counter()
+        arrs, plots = cc.ng_raw_read(fname)
+        elapsed = time.perf_counter() - tick
+
+        print(f"{'ASCII' if ascii else 'Binary':>6}: {size_mb:8.1f} MB in {elapsed:6.3f} s "
+              f"({size_mb / elapsed:8.1f} MB/s, {data.size / elapsed / 1e6:6.1f} M values/s)")
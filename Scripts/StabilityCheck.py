@@ -0,0 +1,41 @@
+import CircuitCruncher as cc
+import numpy as np
+
+# Change this to where you downloaded the repo
+# Enable this if: t you didn't Setup repo on device using python3 -m pip install --user -e
+# sys.path.append('/home/tare/Repos/CircuitCruncher/CircuitCruncher')
+
+# Checks measure_stability_batch against the phase margin of analytic loop gains, in both sign conventions
+# of the probe, including loops whose phase starts with lag (dominant pole below the sweep start) or lead
+# (AC coupling)
+
+
+def w(f):
+    return 2 * np.pi * f
+
+
+def expected_pm(frequencies, loop_gain):
+    """Phase margin of T at its (single) gain crossover, wrapped into (-180, 180]."""
+    idx = np.argmin(np.abs(np.abs(loop_gain) - 1))
+    return 180 - np.mod(-np.degrees(np.angle(loop_gain[idx])), 360)
+
+
+frequencies = np.logspace(0, 8, 8001)
+s = 1j * w(frequencies)
+loops = {
+    'dominant pole at 0.01 Hz': 1e4 / ((1 + s / w(0.01)) * (1 + s / w(1e3))),
+    'dominant pole at 0.1 Hz': 1e4 / ((1 + s / w(0.1)) * (1 + s / w(1e2))),
+    'AC coupled (phase lead)': 1e4 * (s / w(10)) / ((1 + s / w(10)) * (1 + s / w(1e3)) * (1 + s / w(1e6))),
+    'unstable three poles': 1e6 / ((1 + s / w(1.5)) * (1 + s / w(1e4)) * (1 + s / w(3e4))),
+}
+
+failed = 0
+for name, loop_gain in loops.items():
+    expected = expected_pm(frequencies, loop_gain)
+    for sign, label in ((1, 'T'), (-1, '-T')):
+        pm = cc.measure_stability_batch(frequencies, sign * loop_gain)['PM'][0]
+        ok = abs(pm - expected) < 0.1
+        failed += not ok
+        print(f"{name:28s} {label:3s} PM = {pm:8.2f} deg, expected {expected:8.2f} deg {'ok' if ok else 'FAILED'}")
+
+print(f"{failed} failed")